@@ -2,7 +2,7 @@ __all__ = (
 	"Marker", "PointMarker", "PatchMarker", "ClippablePatchMarker",
 	"OffsetMarker", "Element", "Textured", "Corner", "Rectangle",
 	"ItemSlot", "FluidTank", "Crop", "ProgressBar", "Atlas",
-	"Texture", "GuiAnnotation", "define_namespace"
+	"Texture", "GuiAnnotation", "define_namespace", "stack_assets"
 )
 
 __version__ = "0.0.1"
@@ -0,0 +1,70 @@
+'''Command line entry, e.g.
+	python -m magcot build scripts/ -o out/ -n mymod=path/to/assets
+'''
+
+import argparse
+import os
+import sys
+from typing import *
+# # #
+from .batch import OUTPUT_KINDS, build_all, discover_scripts, format_report
+from .contextmanager import CurrentContext, define_namespace, stack_assets
+
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+	parser = argparse.ArgumentParser(prog="magcot")
+	commands = parser.add_subparsers(dest="command", required=True)
+	build = commands.add_parser("build",
+		help="run annotation scripts and export their annotations")
+	build.add_argument("scripts", nargs="+",
+		help="annotation scripts, or folders to look for them in")
+	build.add_argument("-o", "--out-dir", required=True,
+		help="folder to write the outputs into")
+	build.add_argument("-n", "--namespace", action="append", default=[],
+		metavar="NS=ASSETS", help="define a namespace for all the scripts; "
+		"repeated for a namespace, later folders override earlier ones")
+	build.add_argument("-f", "--formats", default="json,java,html",
+		help="comma-separated, any of: " + ", ".join(OUTPUT_KINDS))
+	build.add_argument("-j", "--jobs", type=int, default=None,
+		help="number of worker processes (default: number of CPUs)")
+	build.add_argument("--lang", default="zh_cn",
+		help="language of the webpages")
+	build.add_argument("--no-embed", action="store_true",
+		help="link the page sources instead of embedding them")
+	build.add_argument("--renderer", choices=("dom", "canvas"), default="dom",
+		help="how the webpages show markers (canvas for dense GUIs)")
+	build.add_argument("--texture-loading", default="eager",
+		choices=("eager", "lazy", "files"),
+		help="when the webpages load textures other than the first one")
+	build.add_argument("--force", action="store_true",
+		help="rebuild even if nothing has changed")
+	return parser.parse_args(argv)
+
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+	args = parse_args(argv)
+	for ns_def in args.namespace:
+		ns, sep, path = ns_def.partition("=")
+		if not sep:
+			raise SystemExit(f"Bad namespace definition: '{ns_def}'")
+		if ns in CurrentContext()._namespaces:
+			stack_assets(ns, path)
+		else:
+			define_namespace(ns, path)
+	scripts: List[str] = []
+	for sc in args.scripts:
+		scripts += discover_scripts(sc) if os.path.isdir(sc) else [sc]
+	reports = build_all(scripts, args.out_dir,
+		outputs=[fm.strip() for fm in args.formats.split(",") if fm.strip()],
+		workers=args.jobs, lang=args.lang, embed=not args.no_embed,
+		renderer=args.renderer, texture_loading=args.texture_loading,
+		incremental=True, force=args.force)
+	print(format_report(reports))
+	return 1 if any(rep.status == "failed" for rep in reports) else 0
+
+
+
+if __name__ == "__main__":
+	sys.exit(main())
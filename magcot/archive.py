@@ -0,0 +1,249 @@
+'''Here defines the compact binary format of annotations (".mgct"), and its
+	memory-mapped loader.
+# # #
+Layout (all little-endian):
+	header: magic, version, and (count, offset) of each of the tables
+		below.
+	string table: count + 1 offsets (relative to the end of the offsets),
+		then the UTF-8 bytes of all the strings. Holds element IDs, type
+		names, group IDs, texture names and paths.
+	texture table: (name, path, width, height), strings as indices.
+	group table: (name, first member, member count).
+	member table: element indices of all the groups, group by group.
+	element table: fixed-width records, see `ELEMENT_RECORD`.
+'''
+
+from .elements import *
+# # #
+import mmap
+import struct
+
+
+
+MAGIC = b"MGCT"
+VERSION = 1
+HEADER = struct.Struct("<4sHxx" + "II" * 5)
+# magic, version, (count, offset) of strings, textures, groups, members,
+# elements
+TEXTURE_RECORD = struct.Struct("<IIII")
+GROUP_RECORD = struct.Struct("<III")
+MEMBER_RECORD = struct.Struct("<I")
+ELEMENT_RECORD = struct.Struct("<IIi8ibb2x")
+# name, type name, texture (index in the texture table, -1 for None),
+# ul (or at), size, grid, clip, axis (0 for None, 1 for x, 2 for y),
+# sign (-1 for None, 0 for False, 1 for True)
+COORD_SLOTS: Dict[str, int] = {"at": 3, "ul": 3, "size": 5, "grid": 7,
+	"clip": 9}
+# `to_object` field -> where its x-y pair starts in a record
+AXES: Tuple[Optional[str], ...] = (None, "x", "y")
+
+
+
+class StringTable:
+	'''Intern strings while writing an archive.
+	'''
+
+	def __init__(self) -> None:
+		self.strings: List[str] = []
+		self.index: Dict[str, int] = {}
+
+	def __call__(self, string: str) -> int:
+		if (found := self.index.get(string)) is None:
+			found = self.index[string] = len(self.strings)
+			self.strings.append(string)
+		return found
+
+	def to_bytes(self) -> bytes:
+		encoded = [st.encode("utf-8") for st in self.strings]
+		offsets = [0]
+		for enc in encoded:
+			offsets.append(offsets[-1] + len(enc))
+		return (struct.pack(f"<{len(offsets)}I", *offsets)
+			+ b"".join(encoded))
+
+
+
+def pack_element(obj: Dict[str, Dumpable], strings: StringTable,
+	texture_index: Dict[str, int]) -> bytes:
+	'''Pack the JSON object of an element (see `Element.to_object`) into
+		a record.
+	'''
+	fields = [strings(obj["name"]), strings(obj["type"]), -1,
+		0, 0, 0, 0, 0, 0, 0, 0, 0, -1]
+	for fn, value in obj.items():
+		if fn in ("name", "type"):
+			continue
+		elif fn in COORD_SLOTS:
+			fields[COORD_SLOTS[fn]:COORD_SLOTS[fn] + 2] = value
+		elif fn == "texture":
+			fields[2] = -1 if value is None else texture_index[value]
+		elif fn == "axis":
+			fields[11] = AXES.index(value)
+		elif fn == "sign":
+			fields[12] = -1 if value is None else int(value)
+		else:
+			raise ValueError(f"Field `{fn}` of `{obj['name']}` cannot be "
+				"archived.")
+	return ELEMENT_RECORD.pack(*fields)
+
+
+
+def write_archive(annotation: GuiAnnotation, file_path: str) -> None:
+	'''Write `annotation` into a binary archive.
+	'''
+	strings = StringTable()
+	texture_index: Dict[str, int] = {}
+	texture_bytes: List[bytes] = []
+	for tn, tins in annotation.textures.items():
+		texture_index[tn] = len(texture_bytes)
+		texture_bytes.append(TEXTURE_RECORD.pack(strings(tn),
+			strings(tins.get_preferred_path()), *tins.size))
+	element_bytes = [pack_element(obj, strings, texture_index)
+		for obj in annotation.element_objects()]
+	element_index = {el_id: i for i, el_id in enumerate(annotation.elements)}
+	group_bytes: List[bytes] = []
+	member_bytes: List[bytes] = []
+	for gn, gels in annotation.groups.items():
+		group_bytes.append(GROUP_RECORD.pack(strings(gn), len(member_bytes),
+			len(gels)))
+		member_bytes.extend(MEMBER_RECORD.pack(element_index[el_id])
+			for el_id in gels)
+	# # #
+	tables = [strings.to_bytes(), b"".join(texture_bytes),
+		b"".join(group_bytes), b"".join(member_bytes),
+		b"".join(element_bytes)]
+	counts = [len(strings.strings), len(texture_bytes), len(group_bytes),
+		len(member_bytes), len(element_bytes)]
+	offsets: List[int] = []
+	position = HEADER.size
+	for table in tables:
+		offsets.append(position)
+		position += len(table)
+	with atomic_open(recognize_resource_location(file_path, ext=".mgct"),
+		"wb") as file:
+		file.write(HEADER.pack(MAGIC, VERSION, *(v for pair in
+			zip(counts, offsets) for v in pair)))
+		for table in tables:
+			file.write(table)
+
+
+
+class Archive:
+	'''A memory-mapped binary archive. Element records are only unpacked
+		when asked for.
+	The file stays mapped until `close` is called, also as a context
+		manager; while mapped, it cannot be replaced on Windows.
+	'''
+
+	def __init__(self, file_path: str) -> None:
+		with open(recognize_resource_location(file_path, ext=".mgct"),
+			"rb") as file:
+			self.buffer = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+			# the mapping stays valid after the file is closed
+		magic, version, *layout = HEADER.unpack_from(self.buffer, 0)
+		if magic != MAGIC:
+			raise ValueError(f"'{file_path}' is not a MAGCOT archive.")
+		if version != VERSION:
+			raise ValueError(f"Unsupported archive version {version}.")
+		(n_strings, strings_at, self.n_textures, self.textures_at,
+			self.n_groups, self.groups_at, self.n_members, self.members_at,
+			self.n_elements, self.elements_at) = layout
+		offsets = struct.unpack_from(f"<{n_strings + 1}I", self.buffer,
+			strings_at)
+		base = strings_at + 4 * (n_strings + 1)
+		blob = self.buffer[base:base + offsets[-1]]
+		self.strings = [blob[offsets[i]:offsets[i + 1]].decode("utf-8")
+			for i in range(n_strings)]
+		# offsets count bytes, so slice before decoding
+
+	def close(self) -> None:
+		self.buffer.close()
+
+	def __enter__(self) -> Self:
+		return self
+
+	def __exit__(self, *exc_info: Any) -> None:
+		self.close()
+
+	def texture_records(self) -> List[Tuple[str, str, int, int]]:
+		built: List[Tuple[str, str, int, int]] = []
+		for i in range(self.n_textures):
+			name, path, width, height = TEXTURE_RECORD.unpack_from(
+				self.buffer, self.textures_at + i * TEXTURE_RECORD.size)
+			built.append((self.strings[name], self.strings[path],
+				width, height))
+		return built
+
+	def element_ids(self) -> List[str]:
+		'''IDs of all the elements, without unpacking whole records.
+		'''
+		name_at = struct.Struct("<I")
+		return [self.strings[name_at.unpack_from(self.buffer,
+			self.elements_at + i * ELEMENT_RECORD.size)[0]]
+			for i in range(self.n_elements)]
+
+	def groups(self, ids: List[str]) -> Dict[str, List[str]]:
+		members = struct.unpack_from(f"<{self.n_members}I", self.buffer,
+			self.members_at)
+		built: Dict[str, List[str]] = {}
+		for i in range(self.n_groups):
+			name, first, count = GROUP_RECORD.unpack_from(self.buffer,
+				self.groups_at + i * GROUP_RECORD.size)
+			built[self.strings[name]] = [ids[m] for m in
+				members[first:first + count]]
+		return built
+
+	def element_object(self, el_i: int,
+		texture_names: List[str]) -> Dict[str, Dumpable]:
+		'''Unpack the record of the `el_i`-th element into a JSON object as
+			`Element.to_object` returns.
+		'''
+		fields = ELEMENT_RECORD.unpack_from(self.buffer,
+			self.elements_at + el_i * ELEMENT_RECORD.size)
+		el_type = self.strings[fields[1]]
+		built: Dict[str, Dumpable] = {}
+		for fn in ELEMENT_TYPES[el_type]._object_provider.fields:
+			if fn == "type":
+				built[fn] = el_type
+			elif fn == "name":
+				built[fn] = self.strings[fields[0]]
+			elif fn in COORD_SLOTS:
+				built[fn] = list(fields[COORD_SLOTS[fn]:COORD_SLOTS[fn] + 2])
+			elif fn == "texture":
+				built[fn] = texture_names[fields[2]] if fields[2] >= 0 else None
+			elif fn == "axis":
+				built[fn] = AXES[fields[11]]
+			elif fn == "sign":
+				built[fn] = None if fields[12] < 0 else bool(fields[12])
+		return built
+
+
+
+def load_archive(file_path: str, lazy: bool = True,
+	**kwargs: Any) -> GuiAnnotation:
+	'''Load a binary archive as a `GuiAnnotation`. Textures are trusted (not
+		checked on disk) and their sizes are taken from the archive;
+		elements are created only when accessed.
+	# # #
+	`lazy`: keep the archive mapped to unpack element records when the
+		elements are accessed. Otherwise all the records are unpacked at
+		once and the archive is closed, e.g. to write the file again.
+	`kwargs`: passed to `GuiAnnotation.__init__`.
+	'''
+	archive = Archive(file_path)
+	textures: Dict[str, Texture] = {}
+	for name, path, width, height in archive.texture_records():
+		tins = Texture(path).validate_path(trusted=True)
+		tins.__dict__["size"] = (width, height)
+		# fill the cached property
+		textures[name] = tins
+	texture_names = list(textures)
+	ids = archive.element_ids()
+	groups = archive.groups(ids)
+	if lazy:
+		raw = lambda el_i: archive.element_object(el_i, texture_names)
+	else:
+		with archive:
+			raw = [archive.element_object(el_i, texture_names)
+				for el_i in range(archive.n_elements)].__getitem__
+	return GuiAnnotation.restore(textures, groups, ids, raw, **kwargs)
@@ -0,0 +1,315 @@
+'''Here defines the in-memory index of asset folders, so that resource
+	locations are resolved without touching the disk.
+'''
+
+from difflib import get_close_matches
+import os
+import posixpath
+import threading
+from typing import *
+
+
+
+class ScannedFolder(NamedTuple):
+	mtime: int
+	# of the folder when scanned, in nanoseconds
+	files: List[str]
+	# relative paths of the files directly in it
+	subfolders: List[str]
+	# relative paths of the folders directly in it
+
+
+
+def normalized(relative: str) -> str:
+	return posixpath.normpath(relative.replace("\\", "/"))
+
+
+
+def close_matches(files: Iterable[str], relative: str, within: str = "",
+	n: int = 3) -> List[str]:
+	'''Paths among `files` similar to `relative`, for "did you mean"
+		hints. Only the files with the same extension in the same folder
+		are considered, and their names are compared without it.
+	# # #
+	`within`: a folder to look in, which `relative` and the results are
+		relative to, e.g. "textures".
+	'''
+	prefix = within.rstrip("/") + "/" if within else ""
+	folder, name = posixpath.split(prefix + normalized(relative))
+	stem, ext = posixpath.splitext(name)
+	stems: Dict[str, str] = {}
+	# stem -> relative path
+	for fn in files:
+		found_folder, found_name = posixpath.split(fn)
+		found_stem, found_ext = posixpath.splitext(found_name)
+		if found_folder == folder and found_ext == ext:
+			stems[found_stem] = fn[len(prefix):]
+	return [stems[found] for found in
+		get_close_matches(stem, list(stems), n=n, cutoff=0.6)]
+
+
+
+class AssetTree:
+	'''All the files under a folder, scanned once with `os.scandir` and
+		keyed by their paths relative to it. Folders are scanned again
+		only if their mtime changed, i.e. files were added, removed or
+		renamed in them.
+	'''
+
+	def __init__(self, root: str) -> None:
+		self.root = root.replace("\\", "/").rstrip("/")
+		self.files: Dict[str, str] = {}
+		# relative path -> full path
+		self.folders: Dict[str, ScannedFolder] = {}
+		# relative path ("" for the root) -> what was found in it
+		self.revision = 0
+		# increased whenever a folder is scanned again or dropped
+		self._lock = threading.Lock()
+		# textures are validated from many threads, see `prefetch_textures`
+		with self._lock:
+			self._scan("")
+
+	def _full_path(self, relative: str) -> str:
+		return f"{self.root}/{relative}" if relative else self.root
+
+	def _drop(self, relative: str) -> None:
+		if (found := self.folders.pop(relative, None)) is None:
+			return
+		self.revision += 1
+		for fn in found.files:
+			self.files.pop(fn, None)
+		for sub in found.subfolders:
+			self._drop(sub)
+
+	def _scan(self, relative: str) -> None:
+		'''Scan the folder at `relative`, and the subfolders not scanned
+			yet.
+		'''
+		self.revision += 1
+		old = self.folders.pop(relative, None)
+		if old is not None:
+			for fn in old.files:
+				self.files.pop(fn, None)
+		folder = self._full_path(relative)
+		prefix = relative + "/" if relative else ""
+		files: List[str] = []
+		subfolders: List[str] = []
+		try:
+			mtime = os.stat(folder).st_mtime_ns
+			# before listing, so that changes meanwhile are found next time
+			with os.scandir(folder) as entries:
+				for en in entries:
+					if en.is_dir():
+						subfolders.append(prefix + en.name)
+					elif en.is_file():
+						files.append(prefix + en.name)
+		except OSError:
+			# removed
+			for sub in old.subfolders if old is not None else ():
+				self._drop(sub)
+			return
+		self.folders[relative] = ScannedFolder(mtime, files, subfolders)
+		for fn in files:
+			self.files[fn] = self._full_path(fn)
+		if old is not None:
+			for sub in set(old.subfolders) - set(subfolders):
+				self._drop(sub)
+		for sub in subfolders:
+			if sub not in self.folders:
+				self._scan(sub)
+
+	def _check(self, relative: str) -> None:
+		'''Scan again the folder at `relative` if it changed, or its
+			nearest scanned ancestor if it was not found. Only one stat.
+		'''
+		while relative not in self.folders and relative:
+			relative = posixpath.dirname(relative)
+		if (found := self.folders.get(relative)) is None:
+			# the root was removed
+			self._scan(relative)
+			return
+		try:
+			mtime = os.stat(self._full_path(relative)).st_mtime_ns
+		except OSError:
+			self._drop(relative)
+			return
+		if mtime != found.mtime:
+			self._scan(relative)
+
+	def _refresh(self) -> None:
+		for relative in list(self.folders):
+			if (found := self.folders.get(relative)) is None:
+				# dropped with its parent
+				continue
+			try:
+				mtime = os.stat(self._full_path(relative)).st_mtime_ns
+			except OSError:
+				self._drop(relative)
+				continue
+			if mtime != found.mtime:
+				self._scan(relative)
+
+	def refresh(self) -> None:
+		'''Scan again the folders changed since scanned. Only stats each
+			folder otherwise.
+		'''
+		with self._lock:
+			self._refresh()
+
+	def find(self, relative: str, check: bool = False) -> Optional[str]:
+		'''Return the full path of the file at `relative`, or None if there
+			is no such file. The index is refreshed before giving up; files
+			removed since found keep being found until `refresh`.
+		# # #
+		`check`: also check the folder of a file found (see `_check`), at
+			the cost of one stat, so that removed files are not found.
+		'''
+		relative = normalized(relative)
+		if relative.startswith("../"):
+			# outside the tree
+			full_path = posixpath.join(self.root, relative)
+			return full_path if os.path.isfile(full_path) else None
+		with self._lock:
+			if check and relative in self.files:
+				self._check(posixpath.dirname(relative))
+			if (found := self.files.get(relative)) is None:
+				self._refresh()
+				found = self.files.get(relative)
+			return found
+
+	def snapshot(self) -> Tuple[int, Dict[str, str]]:
+		'''The revision and a copy of the files, taken together.
+		'''
+		with self._lock:
+			return self.revision, dict(self.files)
+
+	def suggest(self, relative: str, within: str = "",
+		n: int = 3) -> List[str]:
+		'''See `close_matches`.
+		'''
+		with self._lock:
+			files = list(self.files)
+		return close_matches(files, relative, within, n)
+
+
+
+class AssetOverlay:
+	'''Trees stacked on each other, e.g. of a mod, its addons and resource
+		packs overriding them: each relative path resolves to the file in
+		the topmost tree having it. The trees are merged once into one
+		dictionary, and again only when any of them has changed, so that
+		lookups never probe the layers one by one.
+	Looked up as an `AssetTree`.
+	'''
+
+	def __init__(self, trees: Sequence[AssetTree]) -> None:
+		self.trees = tuple(trees)
+		# bottom first
+		self.files: Dict[str, str] = {}
+		# relative path -> full path in the winning tree
+		self._revisions: Tuple[int, ...] = ()
+		self._lock = threading.Lock()
+		with self._lock:
+			self._merge()
+
+	def _merge(self) -> None:
+		if tuple(tree.revision for tree in self.trees) == self._revisions:
+			return
+		snapshots = [tree.snapshot() for tree in self.trees]
+		revisions = tuple(rev for rev, _ in snapshots)
+		merged: Dict[str, str] = {}
+		for _, files in snapshots:
+			merged.update(files)
+			# upper layers override
+		self.files = merged
+		self._revisions = revisions
+
+	def refresh(self) -> None:
+		'''Refresh the trees, and merge them again if any has changed.
+		'''
+		for tree in self.trees:
+			tree.refresh()
+		with self._lock:
+			self._merge()
+
+	def find(self, relative: str) -> Optional[str]:
+		'''Return the full path of the file at `relative` in the topmost
+			tree having it, or None: one lookup in the merged dictionary.
+			The trees are refreshed and merged again before giving up, or
+			by `refresh`; files added to upper trees since override only
+			then.
+		'''
+		relative = normalized(relative)
+		if relative.startswith("../"):
+			# outside the trees
+			return next((found for tree in reversed(self.trees)
+				if (found := tree.find(relative)) is not None), None)
+		if (found := self.files.get(relative)) is None:
+			self.refresh()
+			found = self.files.get(relative)
+		return found
+
+	def suggest(self, relative: str, within: str = "",
+		n: int = 3) -> List[str]:
+		'''See `close_matches`.
+		'''
+		return close_matches(list(self.files), relative, within, n)
+
+
+
+class AssetIndex:
+	'''An `AssetTree` for each folder looked into, e.g. the folder of a
+		namespace in its "assets" folder.
+	# # #
+	Singleton class.
+	'''
+
+	__instance: "Optional[Self]" = None
+	__slots__ = ("_trees", "_overlays", "_lock")
+
+	def __new__(cls):
+		'''To make this singleton.
+		'''
+		if cls.__instance is None:
+			hold = super().__new__(cls)
+			hold._trees: Dict[str, AssetTree] = {}
+			# root folder -> tree
+			hold._overlays: Dict[Tuple[str, ...], AssetOverlay] = {}
+			# root folders, bottom first -> overlay
+			hold._lock = threading.Lock()
+			cls.__instance = hold
+		return cls.__instance
+
+	def tree(self, root: str) -> AssetTree:
+		'''Return the tree of `root`, scanned when first asked for.
+		'''
+		with self._lock:
+			if (found := self._trees.get(root)) is None:
+				found = self._trees[root] = AssetTree(root)
+			return found
+
+	def resolver(self, roots: Sequence[str]
+	) -> Union[AssetTree, AssetOverlay]:
+		'''Return the tree of `roots` if only one, otherwise their overlay
+			(bottom first), merged when first asked for.
+		'''
+		if len(roots) == 1:
+			return self.tree(roots[0])
+		trees = [self.tree(root) for root in roots]
+		with self._lock:
+			if (found := self._overlays.get(tuple(roots))) is None:
+				found = self._overlays[tuple(roots)] = AssetOverlay(trees)
+			return found
+
+	def refresh(self) -> None:
+		'''Refresh all the trees and overlays, see `AssetTree.refresh`.
+		'''
+		for tree in list(self._trees.values()):
+			tree.refresh()
+		for overlay in list(self._overlays.values()):
+			overlay.refresh()
+
+	def clear(self) -> None:
+		with self._lock:
+			self._trees.clear()
+			self._overlays.clear()
@@ -0,0 +1,289 @@
+'''Here defines batch builds, which run many annotation scripts (usually one
+	per GUI) in a process pool and export what each of them annotates.
+# # #
+An annotation script is a Python file that creates a `GuiAnnotation`; the
+	one focused on last (see `CurrentContext`) when the script ends is
+	exported, to files named after the script.
+Scripts are run with `__name__` set to "__magcot__", so that code guarded
+	by `if __name__ == "__main__"` does not run. A script exiting (e.g. by
+	`sys.exit`) only fails its own job.
+'''
+
+from . import __version__
+from .elements import *
+# # #
+from concurrent.futures import ProcessPoolExecutor
+import glob
+import hashlib
+import runpy
+from time import perf_counter
+import traceback
+
+
+
+OUTPUT_KINDS: Dict[str, str] = {"json": ".json", "java": ".java",
+	"html": ".html", "binary": ".mgct"}
+# output kind -> file extension
+
+
+
+MANIFEST_NAME = ".magcot-manifest.json"
+
+
+
+class JobReport(NamedTuple):
+	script: str
+	status: Literal["ok", "failed", "skipped"]
+	seconds: float
+	outputs: Tuple[str, ...]
+	# paths of files written (or up to date if skipped)
+	error: Optional[str] = None
+	# traceback if failed
+	textures: Tuple[str, ...] = ()
+	# full paths of the textures used
+
+
+
+def discover_scripts(root: str, pattern: str = "**/*.py") -> List[str]:
+	'''Find annotation scripts under `root`. Files starting with "_" (such
+		as "__init__.py") are skipped.
+	'''
+	return sorted(path.replace("\\", "/") for path in
+		glob.glob(os.path.join(root, pattern), recursive=True)
+		if not os.path.basename(path).startswith("_"))
+
+
+
+def output_paths(script: str, out_dir: str,
+	outputs: Iterable[str]) -> Dict[str, str]:
+	stem = os.path.splitext(os.path.basename(script))[0]
+	return {kind: f"{out_dir}/{stem}{OUTPUT_KINDS[kind]}" for kind in outputs}
+
+
+
+base_namespaces: Dict[str, str] = {}
+base_layers: Dict[str, List[str]] = {}
+# namespaces (and assets stacked over them) each job starts with, set by
+# `initialize_worker`
+
+
+
+def initialize_worker(namespaces: Dict[str, str],
+	layers: Dict[str, List[str]]) -> None:
+	'''Run once in each worker. Namespaces defined before the batch started
+		are available to every script.
+	'''
+	global base_namespaces, base_layers
+	base_namespaces = dict(namespaces)
+	base_layers = {ns: list(roots) for ns, roots in layers.items()}
+
+
+
+def reset_context() -> None:
+	'''Forget annotations and namespaces left by the previous job of this
+		worker.
+	'''
+	context = CurrentContext()
+	context._context.clear()
+	context._namespaces.clear()
+	# cleared in place, for `hook_` refers to the same dictionary
+	context._namespaces.update(base_namespaces)
+	context._layers.clear()
+	context._layers.update((ns, list(roots))
+		for ns, roots in base_layers.items())
+	AssetIndex().refresh()
+	# assets may have changed since the previous job
+
+
+
+def build_one(script: str, out_dir: str, outputs: Tuple[str, ...],
+	lang: str, embed: bool, renderer: str = "dom",
+	texture_loading: str = "eager") -> JobReport:
+	'''Run an annotation script and export its annotation. Errors are
+		reported, not raised, also `SystemExit` and `KeyboardInterrupt`
+		raised by the script.
+	'''
+	start = perf_counter()
+	written: List[str] = []
+	try:
+		reset_context()
+		runpy.run_path(script, run_name="__magcot__")
+		if (annotation := CurrentContext().get()) is None:
+			raise RuntimeError("The script did not create a GuiAnnotation.")
+		for kind, path in output_paths(script, out_dir, outputs).items():
+			if kind == "json":
+				annotation.serialize(path)
+			elif kind == "java":
+				annotation.to_Java_fragment(path)
+			elif kind == "html":
+				annotation.assemble_webpage(path, embed=embed, lang=lang,
+					renderer=renderer, texture_loading=texture_loading)
+				if texture_loading == "files":
+					written += [f"{out_dir}/{rel_path}" for rel_path in
+						annotation.write_HTML_side_files(out_dir, indent=4,
+							texture_loading=texture_loading)]
+					# already written, listed so that they are checked
+			elif kind == "binary":
+				annotation.to_binary(path)
+			written.append(path)
+		# every file is written atomically, see `atomic_open`
+	except BaseException:
+		return JobReport(script, "failed", perf_counter() - start,
+			tuple(written), traceback.format_exc())
+	finally:
+		TextureMetadataCache().save()
+		# workers exit without running `atexit` hooks
+	return JobReport(script, "ok", perf_counter() - start, tuple(written),
+		textures=tuple(sorted({tins.texture_path
+			for tins in annotation.textures.values()})))
+
+
+
+class BuildManifest:
+	'''Content hashes of what each output of a batch build was built from:
+		the script, the textures it used, the version of this package, the
+		page assets in `blocks/` and the build options. Jobs whose inputs
+		have not changed are skipped.
+	Hashes come from `TextureMetadataCache`, so unchanged files are only
+		stat-ed, not read.
+	Only the script itself is tracked, not the modules it imports.
+	'''
+
+	def __init__(self, out_dir: str, options: Dict[str, Dumpable]) -> None:
+		self.path = f"{out_dir}/{MANIFEST_NAME}"
+		self.common: Dict[str, Dumpable] = {"version": __version__,
+			"blocks": self.blocks_digest(), **options}
+		# shared by all the jobs
+		try:
+			with open(self.path, encoding="utf-8") as file:
+				self.entries: Dict[str, Dict[str, Any]] = json.load(file)
+		except (OSError, ValueError):
+			self.entries = {}
+
+	@staticmethod
+	def blocks_digest() -> str:
+		cache = TextureMetadataCache()
+		digests: List[str] = []
+		for folder, dirs, files in os.walk(BLOCKS_BASE):
+			dirs.sort()
+			for fn in sorted(files):
+				path = os.path.join(folder, fn)
+				digests.append(os.path.relpath(path, BLOCKS_BASE) + ":"
+					+ cache.digest_of(path))
+		return hashlib.sha256("\n".join(digests).encode()).hexdigest()
+
+	def is_fresh(self, script: str) -> Optional[JobReport]:
+		'''Return a "skipped" report if the outputs of `script` are up to
+			date; otherwise None.
+		'''
+		entry = self.entries.get(os.path.abspath(script))
+		if entry is None or entry["common"] != self.common:
+			return None
+		cache = TextureMetadataCache()
+		try:
+			if cache.digest_of(script) != entry["script"] or any(
+				cache.digest_of(path) != digest
+				for path, digest in entry["textures"].items()):
+				return None
+		except OSError:
+			# an input was removed
+			return None
+		if not all(os.path.isfile(path) for path in entry["outputs"]):
+			return None
+		return JobReport(script, "skipped", 0.0, tuple(entry["outputs"]),
+			textures=tuple(entry["textures"]))
+
+	def record(self, report: JobReport) -> None:
+		key = os.path.abspath(report.script)
+		if report.status == "failed":
+			self.entries.pop(key, None)
+			return
+		cache = TextureMetadataCache()
+		self.entries[key] = {"common": self.common,
+			"script": cache.digest_of(report.script),
+			"textures": {path: cache.digest_of(path)
+				for path in report.textures},
+			"outputs": list(report.outputs)}
+
+	def save(self) -> None:
+		with atomic_open(self.path, "w", encoding="utf-8") as file:
+			json.dump(self.entries, file, indent="\t")
+
+
+
+def build_all(scripts: Union[str, Iterable[str]], out_dir: str,
+	outputs: Iterable[str] = ("json", "java", "html"),
+	workers: Optional[int] = None, lang: str = "zh_cn",
+	embed: bool = True, renderer: Literal["dom", "canvas"] = "dom",
+	texture_loading: Literal["eager", "lazy", "files"] = "eager",
+	incremental: bool = False, force: bool = False) -> List[JobReport]:
+	'''Build annotation scripts in parallel, one job per script.
+	# # #
+	`scripts`: paths of scripts, or a folder to discover them in.
+	`outputs`: what to export, any of "json", "java", "html" and "binary".
+	`workers`: the number of processes, by default the number of CPUs.
+	`lang`, `embed`, `renderer`, `texture_loading`: see
+		`GuiAnnotation.assemble_webpage`.
+	`incremental`: skip scripts whose inputs are unchanged since the last
+		build into `out_dir`, see `BuildManifest`.
+	`force`: with `incremental`, rebuild every script anyway, but still
+		record the manifest.
+	Reports are returned in the order of `scripts`.
+	'''
+	if isinstance(scripts, str):
+		scripts = discover_scripts(scripts)
+	else:
+		scripts = [str(sc) for sc in scripts]
+	if unknown := set(outputs) - set(OUTPUT_KINDS):
+		raise ValueError(f"Unsupported output kinds: {sorted(unknown)}")
+	outputs = tuple(outputs)
+	os.makedirs(out_dir, exist_ok=True)
+	reports: List[Optional[JobReport]] = [None] * len(scripts)
+	if incremental:
+		manifest = BuildManifest(out_dir, {"outputs": list(outputs),
+			"lang": lang, "embed": embed, "renderer": renderer,
+			"texture_loading": texture_loading,
+			"namespaces": dict(CurrentContext()._namespaces),
+			"layers": dict(CurrentContext()._layers)})
+		if not force:
+			reports = [manifest.is_fresh(sc) for sc in scripts]
+	if pending := [i for i, rep in enumerate(reports) if rep is None]:
+		with ProcessPoolExecutor(max_workers=workers,
+			initializer=initialize_worker,
+			initargs=(dict(CurrentContext()._namespaces),
+				dict(CurrentContext()._layers))) as executor:
+			futures = {i: executor.submit(build_one, scripts[i], out_dir,
+				outputs, lang, embed, renderer, texture_loading)
+				for i in pending}
+			for i, fu in futures.items():
+				try:
+					reports[i] = fu.result()
+				except Exception:
+					# e.g. the worker died, see `BrokenProcessPool`
+					reports[i] = JobReport(scripts[i], "failed", 0.0, (),
+						traceback.format_exc())
+	if incremental:
+		for rep in reports:
+			manifest.record(rep)
+		manifest.save()
+		TextureMetadataCache().save()
+	return reports
+
+
+
+def format_report(reports: List[JobReport]) -> str:
+	'''Summarize a batch build as text, one line per job, failures with
+		their tracebacks.
+	'''
+	built: List[str] = []
+	for rep in reports:
+		built.append(f"[{rep.status:>7}] {rep.seconds:8.3f}s  {rep.script}")
+		if rep.error:
+			built.append("\n".join("\t" + ln
+				for ln in rep.error.rstrip().splitlines()))
+	counts = {st: sum(rep.status == st for rep in reports)
+		for st in ("ok", "skipped", "failed")}
+	built.append(f"{counts['ok']} built, {counts['skipped']} up to date, "
+		f"{counts['failed']} failed, "
+		f"{sum(rep.seconds for rep in reports):.3f}s in total")
+	return "\n".join(built)
@@ -4,8 +4,10 @@ function findRatio() {
 	[maxWidth, maxHeight] = [256, 256]
 	for (var i = 0; i < allTextures.length; ++i) {
 		// find the max width and height among all the textures
+		// texture data are parsed here once, and kept in `textureData`
 		let tex = allTextures[i]
 		let texData = JSON.parse(tex.getAttribute("data"))
+		textureData.push(texData)
 		maxWidth = Math.max(maxWidth, texData.w)
 		maxHeight = Math.max(maxHeight, texData.h)
 	}
@@ -35,7 +37,7 @@ function processTextures() {
 	// and collect texture information
 	for (var i = 0; i < allTextures.length; ++i) {
 		let tex = allTextures[i]
-		let texData = JSON.parse(tex.getAttribute("data"))
+		let texData = textureData[i]
 		texturePaths.push(texData.path)
 		let texImg = tex.querySelector("img")
 		texImg.style.width = magnification * texData.w + "px"
@@ -44,46 +46,154 @@ function processTextures() {
 }
 
 
-function placeElements() {
-	// place all the elements to where they should be
-	for (var i = 0; i < allElements.length; ++i) {
-		let el = allElements[i]
-		let elData = JSON.parse(el.getAttribute("data"))
-		el.style.zIndex = elData.z_index
+// how each kind of marker rows is turned into an element:
+// its classes, its click handler, and the names of the values after x-y
+const MARKER_KINDS = {
+	"point": ["element point", "logPointInfo", []],
+	"offset": ["element point", "logPointInfo", []],
+	"patch": ["element area patch", "logPatchInfo", ["w", "h"]],
+	"cpatch": ["element area cpatch", "logClippablePatchInfo",
+		["w", "h", "direction"]],
+	"grid": ["element area grid", "logGridInfo",
+		["clip_w", "clip_h", "grid_x", "grid_y"]],
+}
+
+
+function createElement(row) {
+	// create and place an element from a marker row:
+	// [id, kind, symbol, color, z-index, additional classes, x, y, ...]
+	let [id, kind, symbol, color, zIndex, classes, x, y] = row
+	let [baseClasses, handlerName, valueNames] = MARKER_KINDS[kind]
+	let el = document.createElement("div")
+	el.id = id
+	el.className = classes ? baseClasses + " " + classes : baseClasses
+	el.textContent = symbol
+	let data = {"x": x, "y": y, "color": color, "z_index": zIndex}
+	for (var i = 0; i < valueNames.length; ++i) {
+		data[valueNames[i]] = row[8 + i]
 	}
-	for (var i = 0; i < allPoints.length; ++i) {
+	el.markerData = data
+	// read by the `log...Info` functions instead of a data attribute
+	let handler = window[handlerName]
+	el.addEventListener("click", () => handler(el))
+	el.style.zIndex = zIndex
+	if (kind == "point" || kind == "offset") {
 		// add point style
-		let pn = allPoints[i]
-		let pnData = JSON.parse(pn.getAttribute("data"))
-		pn.style.left = "calc(" + magnification * pnData.x + "px - 0.85em)"
-		pn.style.top = "calc(" + magnification * pnData.y + "px - 0.85em)"
-		pn.style.backgroundColor = pnData.color
-	}
-	for (var i = 0; i < allAreas.length; ++i) {
-		// add area style
-		let ar = allAreas[i]
-		let arData = JSON.parse(ar.getAttribute("data"))
-		ar.style.left = magnification * arData.x + "px"
-		ar.style.top = magnification * arData.y + "px"
-		ar.style.borderColor = arData.color
-		ar.style.color = arData.color
-		ar.style.width = magnification * arData.w + "px"
-		ar.style.height = magnification * arData.h + "px"
-	}
-	for (var i = 0; i < allGrids.length; ++i) {
-		// correct grid patch sizes
-		let grd = allGrids[i]
-		let grdData = JSON.parse(grd.getAttribute("data"))
-		let grdPatchWidth = grdData.clip_w * grdData.grid_x
-		let grdPatchHeight = grdData.clip_h * grdData.grid_y
-		grd.style.width = magnification * grdPatchWidth + "px"
-		grd.style.height = magnification * grdPatchHeight + "px"
+		el.style.left = "calc(" + magnification * x + "px - 0.85em)"
+		el.style.top = "calc(" + magnification * y + "px - 0.85em)"
+		el.style.backgroundColor = color
+		return el
+	}
+	// add area style
+	el.style.left = magnification * x + "px"
+	el.style.top = magnification * y + "px"
+	el.style.borderColor = color
+	el.style.color = color
+	if (kind == "grid") {
+		// grid patch sizes
+		el.style.width = magnification * data.clip_w * data.grid_x + "px"
+		el.style.height = magnification * data.clip_h * data.grid_y + "px"
+	} else {
+		el.style.width = magnification * data.w + "px"
+		el.style.height = magnification * data.h + "px"
+	}
+	return el
+}
+
+
+function usesCanvas() {
+	return typeof rendererMode !== "undefined" && rendererMode == "canvas"
+}
+
+
+function placeMarkers(i, rows) {
+	// create the markers of the i-th texture from its marker rows
+	if (usesCanvas()) {
+		// see canvasrender.js
+		canvasLayers[i] = new MarkerLayer(allTextures[i], textureData[i], rows)
+		return
+	}
+	let built = document.createDocumentFragment()
+	for (var j = 0; j < rows.length; ++j) {
+		built.appendChild(createElement(rows[j]))
+	}
+	allTextures[i].appendChild(built)
+	// inserted at once
+}
+
+
+function registerMarkers(i, payload) {
+	// called by the marker files of textures loaded from files
+	placeMarkers(i, payload.markers)
+}
+
+
+function isDeferred(tex) {
+	// whether a texture is only loaded when first shown
+	return tex.querySelector("script.lazysrc") !== null
+		|| tex.querySelector("script.markerfile") !== null
+}
+
+
+function loadTexture(i) {
+	// load the image and the markers of the i-th texture, only once
+	// the marker payload is parsed here, not on opening the page
+	if (textureLoaded[i]) {
+		return
+	}
+	textureLoaded[i] = true
+	let tex = allTextures[i]
+	let texImg = tex.querySelector("img")
+	let lazySource = tex.querySelector("script.lazysrc")
+	if (lazySource !== null) {
+		// an embedded data URL
+		texImg.src = lazySource.textContent
+		lazySource.remove()
+	} else if (texImg.hasAttribute("data-src")) {
+		// a file beside the page
+		texImg.src = texImg.getAttribute("data-src")
+	}
+	let payload = tex.querySelector("script.markerdata")
+	let markerFile = tex.querySelector("script.markerfile")
+	if (payload !== null) {
+		placeMarkers(i, JSON.parse(payload.textContent).markers)
+	} else if (markerFile !== null) {
+		let loader = document.createElement("script")
+		loader.src = markerFile.getAttribute("data-src")
+		document.head.appendChild(loader)
+		// the file calls `registerMarkers` once loaded
+	}
+}
+
+
+function placeElements() {
+	// load all the textures that are not deferred; the others are loaded
+	// by `refreshDisplayArea` when shown
+	for (var i = 0; i < allTextures.length; ++i) {
+		if (!isDeferred(allTextures[i])) {
+			loadTexture(i)
+		}
 	}
 }
 
 
+function addBulkButton(textKey, visible) {
+	let bulkButton = document.createElement("div")
+	bulkButton.classList.add("texalt")
+	bulkButton.classList.add("texon")
+	bulkButton.innerText = langEntries[textKey]
+	bulkButton.addEventListener("click", () => setAllGroupsVisible(visible))
+	buttonField.appendChild(bulkButton)
+}
+
+
 function addGroupButtons() {
 	// add buttons to toggle visibility of the group elements on the left
+	// right-clicking a button shows only that group
+	if (Object.keys(allGroupData).length > 1) {
+		addBulkButton("group.showall", true)
+		addBulkButton("group.hideall", false)
+	}
 	for (let gn in allGroupData) {
 		let groupButton = document.createElement("div")
 		groupButton.classList.add("grouptoggler")
@@ -91,6 +201,11 @@ function addGroupButtons() {
 		groupButton.id = "btn--" + gn
 		groupButton.innerText = gn
 		groupButton.setAttribute("onclick", `toggleClass(this, '${gn}')`)
+		groupButton.title = langEntries["group.hint"]
+		groupButton.addEventListener("contextmenu", (ev) => {
+			ev.preventDefault()
+			showOnlyGroup(gn)
+		})
 		let nEl = allGroupData[gn].length
 		if (nEl > 9) {
 			// the circle marker at the top-right corder can only display
@@ -144,6 +259,7 @@ document.addEventListener(
 		infoWindow.innerText = langEntries["info.hint"]
 		buttonField = document.getElementById("buttonfield")
 		allTextures = document.getElementsByClassName("texwrap")
+		textureData = []
 		allElements = document.getElementsByClassName("element")
 		allPoints = document.getElementsByClassName("point")
 		allAreas = document.getElementsByClassName("area")
@@ -154,6 +270,11 @@ document.addEventListener(
 
 		findRatio()
 		processTextures()
+		textureLoaded = []
+		if (usesCanvas()) {
+			// see canvasrender.js
+			prepareCanvases()
+		}
 		placeElements()
 		addGroupButtons()
 		refreshDisplayArea()
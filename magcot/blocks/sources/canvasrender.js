@@ -0,0 +1,201 @@
+// Canvas rendering mode: all the markers of a texture are drawn on one
+// <canvas> over the texture, instead of being created as elements.
+// Hovering and clicking are handled by hit-testing against a grid of
+// buckets, so that pages with thousands of markers stay responsive.
+
+
+const CANVAS_PADDING = 16
+// extra pixels around the texture, for points drawn at its edges
+const CANVAS_CELL = 64
+// size of the hit-testing buckets, in canvas pixels
+
+
+function markerFromRow(row) {
+	// turn a marker row (see `createElement`) into what the layer draws
+	let [id, kind, symbol, color, zIndex, classes, x, y] = row
+	let valueNames = MARKER_KINDS[kind][2]
+	let data = {"x": x, "y": y, "color": color, "z_index": zIndex}
+	for (var i = 0; i < valueNames.length; ++i) {
+		data[valueNames[i]] = row[8 + i]
+	}
+	let marker = {
+		"id": id, "kind": kind, "innerText": symbol, "color": color,
+		"zIndex": zIndex, "groups": classes ? classes.split(" ") : [],
+		"markerData": data, "handler": window[MARKER_KINDS[kind][1]],
+	}
+	// `id`, `innerText` and `markerData` are what `log...Info` reads
+	let [px, py] = [magnification * x + CANVAS_PADDING,
+		magnification * y + CANVAS_PADDING]
+	if (kind == "point" || kind == "offset") {
+		marker.radius = 0.85 * markerFontSize / 0.8
+		// as `.point`, 1.7em wide in the 80% font size
+		marker.box = [px - marker.radius, py - marker.radius,
+			px + marker.radius, py + marker.radius]
+	} else if (kind == "grid") {
+		marker.box = [px, py, px + magnification * data.clip_w * data.grid_x,
+			py + magnification * data.clip_h * data.grid_y]
+	} else {
+		marker.box = [px, py, px + magnification * data.w,
+			py + magnification * data.h]
+	}
+	return marker
+}
+
+
+class MarkerLayer {
+
+	constructor(tex, texData, rows) {
+		this.markers = rows.map(markerFromRow)
+		this.markers.sort((a, b) => a.zIndex - b.zIndex)
+		// drawn from the bottom up
+		this.hidden = new Set()
+		// group classes toggled off, updated by each `draw`
+		this.hovered = null
+		this.width = magnification * texData.w + 2 * CANVAS_PADDING
+		this.height = magnification * texData.h + 2 * CANVAS_PADDING
+		this.canvas = document.createElement("canvas")
+		this.canvas.className = "markercanvas"
+		let ratio = window.devicePixelRatio || 1
+		this.canvas.width = Math.ceil(this.width * ratio)
+		this.canvas.height = Math.ceil(this.height * ratio)
+		this.canvas.style.width = this.width + "px"
+		this.canvas.style.height = this.height + "px"
+		this.canvas.style.left = -CANVAS_PADDING + "px"
+		this.canvas.style.top = -CANVAS_PADDING + "px"
+		this.context = this.canvas.getContext("2d")
+		this.context.scale(ratio, ratio)
+		this.buildBuckets()
+		this.canvas.addEventListener("mousemove", (ev) => {
+			let found = this.hitTest(ev.offsetX, ev.offsetY)
+			this.canvas.style.cursor = found ? "pointer" : "default"
+			if (found !== this.hovered) {
+				this.hovered = found
+				this.draw()
+			}
+		})
+		this.canvas.addEventListener("mouseleave", () => {
+			if (this.hovered !== null) {
+				this.hovered = null
+				this.draw()
+			}
+		})
+		this.canvas.addEventListener("click", (ev) => {
+			let found = this.hitTest(ev.offsetX, ev.offsetY)
+			if (found) {
+				found.handler(found)
+			}
+		})
+		tex.appendChild(this.canvas)
+		this.draw()
+	}
+
+	buildBuckets() {
+		// each bucket lists the markers (by drawing order) overlapping it
+		this.buckets = new Map()
+		for (var i = 0; i < this.markers.length; ++i) {
+			let [x0, y0, x1, y1] = this.markers[i].box
+			for (var cx = Math.floor(x0 / CANVAS_CELL);
+				cx <= Math.floor(x1 / CANVAS_CELL); ++cx) {
+				for (var cy = Math.floor(y0 / CANVAS_CELL);
+					cy <= Math.floor(y1 / CANVAS_CELL); ++cy) {
+					let key = cx + "," + cy
+					if (!this.buckets.has(key)) {
+						this.buckets.set(key, [])
+					}
+					this.buckets.get(key).push(i)
+				}
+			}
+		}
+	}
+
+	isVisible(marker) {
+		return !marker.groups.some((gn) => this.hidden.has(gn))
+	}
+
+	hitTest(x, y) {
+		// the topmost visible marker under (x, y), or null
+		let bucket = this.buckets.get(
+			Math.floor(x / CANVAS_CELL) + "," + Math.floor(y / CANVAS_CELL))
+		if (bucket === undefined) {
+			return null
+		}
+		for (var i = bucket.length - 1; i >= 0; --i) {
+			let marker = this.markers[bucket[i]]
+			let [x0, y0, x1, y1] = marker.box
+			if (x < x0 || x > x1 || y < y0 || y > y1
+				|| !this.isVisible(marker)) {
+				continue
+			}
+			if (marker.radius !== undefined) {
+				let [cx, cy] = [(x0 + x1) / 2, (y0 + y1) / 2]
+				if ((x - cx) ** 2 + (y - cy) ** 2 > marker.radius ** 2) {
+					continue
+				}
+			}
+			return marker
+		}
+		return null
+	}
+
+	draw() {
+		// groups are hidden by the classes of the display container, as
+		// for elements, see `setGroupVisible`
+		this.hidden = new Set()
+		for (var i = 0; i < displayWindow.classList.length; ++i) {
+			let cls = displayWindow.classList[i]
+			if (cls.startsWith("hide--")) {
+				this.hidden.add("g--" + cls.slice(6))
+			}
+		}
+		if (this.hovered !== null && !this.isVisible(this.hovered)) {
+			this.hovered = null
+		}
+		let ctx = this.context
+		ctx.clearRect(0, 0, this.width, this.height)
+		ctx.textAlign = "center"
+		ctx.shadowColor = "rgba(0, 0, 0, 0.5)"
+		for (var i = 0; i < this.markers.length; ++i) {
+			let marker = this.markers[i]
+			if (!this.isVisible(marker)) {
+				continue
+			}
+			let [x0, y0, x1, y1] = marker.box
+			let emphasized = marker === this.hovered
+			ctx.shadowBlur = emphasized ? 6 : 2
+			if (marker.radius !== undefined) {
+				// as `.point`: filled circle, white border and symbol
+				ctx.beginPath()
+				ctx.arc((x0 + x1) / 2, (y0 + y1) / 2,
+					marker.radius - 1, 0, 2 * Math.PI)
+				ctx.fillStyle = marker.color
+				ctx.fill()
+				ctx.lineWidth = emphasized ? 3 : 1.5
+				ctx.strokeStyle = "white"
+				ctx.stroke()
+				ctx.font = `400 ${markerFontSize}px sans-serif`
+				ctx.textBaseline = "middle"
+				ctx.fillStyle = "white"
+				ctx.fillText(marker.innerText, (x0 + x1) / 2, (y0 + y1) / 2)
+			} else {
+				// as `.area`: border and symbol in the marker color
+				ctx.lineWidth = emphasized ? 4 : 2.5
+				ctx.strokeStyle = marker.color
+				ctx.strokeRect(x0 + 1.25, y0 + 1.25, x1 - x0 - 2.5,
+					y1 - y0 - 2.5)
+				ctx.font = `600 ${markerFontSize}px sans-serif`
+				ctx.textBaseline = "top"
+				ctx.fillStyle = marker.color
+				ctx.fillText(marker.innerText, (x0 + x1) / 2, y0 + 3)
+			}
+		}
+	}
+
+}
+
+
+function prepareCanvases() {
+	// the layers are created by `placeMarkers`, as textures are loaded
+	markerFontSize = 0.8 * parseFloat(
+		window.getComputedStyle(displayWindow).fontSize)
+	canvasLayers = []
+}
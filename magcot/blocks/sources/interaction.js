@@ -1,28 +1,51 @@
-function toggleClass(button, groupName) {
-	let fullGroupName = "g--" + groupName
-	let groupElements = document.getElementsByClassName(fullGroupName)
-	if (button.classList.contains("groupon")) {
-		// the elements are visible now
-		for (var i = 0; i < groupElements.length; ++i) {
-			// hide the elements
-			let el = groupElements[i]
-			el.style.visibility = "hidden"
-		}
-		button.classList.remove("groupon")
-		button.classList.add("groupoff")
-	} else if (button.classList.contains("groupoff")) {
-		// the elements are hidden now
-		for (var i = 0; i < groupElements.length; ++i) {
-			// show the elements
-			let el = groupElements[i]
-			el.style.visibility = "visible"
+function setGroupVisible(groupName, visible) {
+	// visibility is decided by the CSS rules generated for each group:
+	// elements of group `gn` are hidden while the display container has the
+	// class "hide--`gn`", so a toggle costs the same for any group size
+	displayWindow.classList.toggle("hide--" + groupName, !visible)
+	let button = document.getElementById("btn--" + groupName)
+	if (button !== null) {
+		button.classList.toggle("groupon", visible)
+		button.classList.toggle("groupoff", !visible)
+	}
+}
+
+
+function refreshCanvases() {
+	// markers drawn on canvases are not affected by CSS, see canvasrender.js
+	if (typeof canvasLayers !== "undefined") {
+		for (var i = 0; i < canvasLayers.length; ++i) {
+			if (canvasLayers[i] !== undefined) {
+				// not loaded yet
+				canvasLayers[i].draw()
+			}
 		}
-		button.classList.remove("groupoff")
-		button.classList.add("groupon")
 	}
 }
 
 
+function toggleClass(button, groupName) {
+	setGroupVisible(groupName, !button.classList.contains("groupon"))
+	refreshCanvases()
+}
+
+
+function showOnlyGroup(groupName) {
+	for (let gn in allGroupData) {
+		setGroupVisible(gn, gn == groupName)
+	}
+	refreshCanvases()
+}
+
+
+function setAllGroupsVisible(visible) {
+	for (let gn in allGroupData) {
+		setGroupVisible(gn, visible)
+	}
+	refreshCanvases()
+}
+
+
 function prevTex() {
 	if (texturePointer <= 0) {
 		return
@@ -42,6 +65,7 @@ function nextTex() {
 
 
 function refreshDisplayArea() {
+	loadTexture(texturePointer)
 	for (var i = 0; i < allTextures.length; ++i) {
 		// hide all other texture wrappers
 		let tex = allTextures[i]
@@ -51,8 +75,7 @@ function refreshDisplayArea() {
 			tex.style.display = "none"
 		}
 	}
-	let texPath = JSON.parse(
-		allTextures[texturePointer].getAttribute("data")).path
+	let texPath = textureData[texturePointer].path
 	if (texPath.length > 35) {texPath = texPath.slice(0, 34) + "…"}
 	document.getElementById("texnameframe").innerText = texPath
 	// display the texture path
@@ -111,7 +134,7 @@ function addCopiableListenersInInfo() {
 
 
 function logPointInfo(el) {
-	let data = JSON.parse(el.getAttribute("data"))
+	let data = el.markerData
 	let infoText = processId(el.id, el.innerText)
 	infoText += (`\n<u>${langEntries["element.position"]}</u> = `
 		+ processClickToCopy(`${data.x}, ${data.y}`))
@@ -121,7 +144,7 @@ function logPointInfo(el) {
 
 
 function logPatchInfo(el) {
-	let data = JSON.parse(el.getAttribute("data"))
+	let data = el.markerData
 	let infoText = processId(el.id, el.innerText)
 	infoText += (`\n<u>${langEntries["element.upperleftcorner"]}</u> = `
 		+ processClickToCopy(`${data.x}, ${data.y}`))
@@ -133,7 +156,7 @@ function logPatchInfo(el) {
 
 
 function logClippablePatchInfo(el) {
-	let data = JSON.parse(el.getAttribute("data"))
+	let data = el.markerData
 	let infoText = processId(el.id, el.innerText)
 	infoText += (`\n<u>${langEntries["element.upperleftcorner"]}</u> = `
 		+ processClickToCopy(`${data.x}, ${data.y}`))
@@ -147,7 +170,7 @@ function logClippablePatchInfo(el) {
 
 
 function logGridInfo(el) {
-	let data = JSON.parse(el.getAttribute("data"))
+	let data = el.markerData
 	let infoText = processId(el.id, el.innerText)
 	infoText += (`\n<u>${langEntries["element.upperleftcorner"]}</u> = `
 		+ processClickToCopy(`${data.x}, ${data.y}`))
@@ -0,0 +1,501 @@
+'''Here defines the columnar element store, an alternative storage backend
+	of `GuiAnnotation` that keeps all the markers in NumPy structured arrays
+	instead of a graph of `Element`, `Marker` and `Coord` objects.
+# # #
+NumPy is an optional dependency, only required when this backend is used,
+	i.e. `GuiAnnotation(..., storage="columnar")`.
+'''
+
+from .elements import *
+# # #
+from collections.abc import Mapping as mapping
+
+try:
+	import numpy as np
+except ImportError:
+	np = None
+
+
+
+MARKER_TYPES: Tuple[type, ...] = (PointMarker, OffsetMarker, PatchMarker,
+	ClippablePatchMarker, GridMarker)
+# the type code of a marker is its index in this tuple
+SLOT_COLUMNS: Dict[str, str] = {"at": "ul", "ul": "ul", "size": "size",
+	"direction": "direction", "grid": "grid", "clip": "clip"}
+# which column a `Marker` field is stored in
+# points (and offsets) store their `at` in the `ul` column
+MARKER_DTYPE = [
+	("element", "<i4"),			# index of the element row
+	("field", "<i2"),			# index of the field name
+	("type", "u1"),				# index in `MARKER_TYPES`
+	("ul", "<i4", (2,)),
+	("size", "<i4", (2,)),
+	("direction", "i1", (2,)),
+	("grid", "<i4", (2,)),
+	("clip", "<i4", (2,)),
+	("texture", "<i2"),			# -1 if there is no texture
+	("group", "<i4"),			# index of the group, -1 if none
+]
+ELEMENT_DTYPE = [
+	("kind", "u1"),				# index of the element class
+	("texture", "<i2"),
+	("group", "<i4"),
+	("start", "<i4"),			# the first marker row
+	("count", "<i2"),			# the number of marker rows
+]
+
+
+
+def require_numpy() -> None:
+	'''Raise an error if NumPy is not available.
+	'''
+	if np is None:
+		raise ImportError("The columnar storage requires NumPy, "
+			"which is not installed.")
+
+
+
+class MarkerRow:
+	'''The owner (see `Marker._owner`) of a marker rebuilt from a row of a
+		`ColumnarStore`, through which edits of the marker are written back
+		into the row.
+	'''
+
+	__slots__ = ("store", "row", "marker", "view")
+
+	def __init__(self, store: "ColumnarStore", row: int, marker: Marker,
+		view: Optional["ElementView"]) -> None:
+		self.store = store
+		self.row = row
+		self.marker = marker
+		self.view = view
+
+	def invalidate(self) -> None:
+		self.store.write_back(self.row, self.marker)
+		if self.view is not None:
+			self.view.invalidate()
+
+
+
+class ElementView:
+	'''A lightweight view over one element row of a `ColumnarStore`, which
+		exposes the `Element` API.
+	# # #
+	Markers are rebuilt from the arrays whenever they are accessed, and
+		are not kept anywhere; their fields are written back into the
+		arrays when set, see `MarkerRow`. Views are always created together
+		with the actual element class, see `ColumnarStore.view_type`.
+	'''
+
+	def __getattr__(self, name: str) -> Marker:
+		'''Only called when `name` is not found by normal means, i.e. for
+			marker fields.
+		'''
+		if name.startswith("_"):
+			raise AttributeError(name)
+		markers = self._store.markers_of(self._row, self)
+		for group in markers:
+			if name in group:
+				return group[name]
+		raise AttributeError(f"'{self.__class__.__name__}' object has no "
+			f"attribute '{name}'")
+
+	def __repr__(self) -> str:
+		markers = {fn: mk for group in self._store.markers_of(self._row)
+			for fn, mk in group.items()}
+		return "{}(\n\t{}\n)".format(
+			self.__class__.__name__,
+			";\n\t".join("{} -> {}".format(fn, mk.__repr__())
+				for fn, mk in (("id", self.id), *markers.items())))
+
+	@property
+	def overlap_whitelist(self) -> FrozenSet[str]:
+		return self._store.whitelists.get(self._row, frozenset())
+
+	@overlap_whitelist.setter
+	def overlap_whitelist(self, value: FrozenSet[str]) -> None:
+		self._store.whitelists[self._row] = frozenset(value)
+
+	@property
+	def patches(self) -> Dict[str, Marker]:
+		return self._store.markers_of(self._row, self)[0]
+
+	@property
+	def points(self) -> Dict[str, PointMarker]:
+		return self._store.markers_of(self._row, self)[1]
+
+	@property
+	def offsets(self) -> Dict[str, OffsetMarker]:
+		return self._store.markers_of(self._row, self)[2]
+
+
+
+class ColumnarStore(mapping):
+	'''Keep elements of a `GuiAnnotation` as structured arrays, and work as
+		a read-only mapping from element IDs to `ElementView` instances.
+	# # #
+	Elements are copied into the arrays when appended; the `Element`
+		objects themselves are not kept, so they can be garbage collected.
+	Export methods (`to_objects`, `to_Java_like`) work on whole columns of
+		all the elements of the same class at once.
+	'''
+
+	def __init__(self, context: Optional["GuiAnnotation"] = None,
+		capacity: int = 64) -> None:
+		require_numpy()
+		self.context = context
+		self.markers = np.zeros(capacity, dtype=MARKER_DTYPE)
+		self.element_rows = np.zeros(capacity, dtype=ELEMENT_DTYPE)
+		self.n_markers = 0
+		self.n_elements = 0
+		self._ids: List[str] = []
+		self._index: Dict[str, int] = {}
+		# element ID -> element row
+		self._fields: List[str] = []
+		self._field_index: Dict[str, int] = {}
+		self._classes: List[type] = []
+		self._class_index: Dict[type, int] = {}
+		self._textures: List[Texture] = []
+		self._texture_index: Dict[int, int] = {}
+		# id(texture) -> texture index
+		self._groups: Dict[str, int] = {}
+		# group name -> group index
+		self._view_types: Dict[type, type] = {}
+		self.whitelists: Dict[int, FrozenSet[str]] = {}
+		# element row -> `Element.overlap_whitelist`, only if not empty
+
+	def __getitem__(self, key: str) -> Element:
+		return self.view(self._index[key])
+
+	def __iter__(self) -> Iterator[str]:
+		return iter(self._ids)
+
+	def __len__(self) -> int:
+		return self.n_elements
+
+	def __contains__(self, key: Any) -> bool:
+		return key in self._index
+
+	@staticmethod
+	def _intern(value: Any, table: list, index: dict, key: Any = None) -> int:
+		'''Return the index of `value` in `table`, append it if absent.
+		'''
+		key = value if key is None else key
+		if (found := index.get(key)) is None:
+			found = index[key] = len(table)
+			table.append(value)
+		return found
+
+	@staticmethod
+	def _grown(array: "np.ndarray", needed: int) -> "np.ndarray":
+		'''Return `array` itself if it can hold `needed` rows, or a copy
+			with (at least) doubled capacity.
+		'''
+		if needed <= len(array):
+			return array
+		bigger = np.zeros(max(needed, 2 * len(array)), dtype=array.dtype)
+		bigger[:len(array)] = array
+		return bigger
+
+	def group_index(self, group_id: Optional[str]) -> int:
+		'''Get the index of a group, registering it if necessary. -1 for
+			no group.
+		'''
+		if group_id is None:
+			return -1
+		if (found := self._groups.get(group_id)) is None:
+			found = self._groups[group_id] = len(self._groups)
+		return found
+
+	def append(self, element: Element, group_id: Optional[str] = None) -> int:
+		'''Copy `element` into the arrays. Return its element row.
+		'''
+		if element.id in self._index:
+			raise ValueError(f"There is already an element with id "
+				f"{element.id}.")
+		texture = getattr(element, "texture", None)
+		tex_i = (-1 if texture is None else self._intern(texture,
+			self._textures, self._texture_index, id(texture)))
+		group = self.group_index(group_id)
+		rows = [*element.patches.items(), *element.points.items(),
+			*element.offsets.items()]
+		# the order is the same as in `Element.to_HTML`
+		el_i, mk_i = self.n_elements, self.n_markers
+		self.element_rows = self._grown(self.element_rows, el_i + 1)
+		self.markers = self._grown(self.markers, mk_i + len(rows))
+		self.element_rows[el_i] = (
+			self._intern(element.__class__, self._classes,
+				self._class_index),
+			tex_i, group, mk_i, len(rows)
+		)
+		for fn, mk in rows:
+			record = self.markers[mk_i]
+			record["element"] = el_i
+			record["field"] = self._intern(fn, self._fields,
+				self._field_index)
+			record["type"] = MARKER_TYPES.index(mk.__class__)
+			record["texture"] = tex_i
+			record["group"] = group
+			for slot in mk.__slots__:
+				record[SLOT_COLUMNS[slot]] = getattr(mk, slot).pair
+			mk_i += 1
+		if element.overlap_whitelist:
+			self.whitelists[el_i] = element.overlap_whitelist
+		self._ids.append(element.id)
+		self._index[element.id] = el_i
+		self.n_elements, self.n_markers = el_i + 1, mk_i
+		return el_i
+
+	def view_type(self, cls: type) -> type:
+		'''Get (or create) the view class of an element class.
+		'''
+		if (vt := self._view_types.get(cls)) is None:
+			vt = self._view_types[cls] = type(cls.__name__ + "View",
+				(ElementView, cls), {})
+		return vt
+
+	def view(self, el_i: int) -> Element:
+		'''Create a view of the element at row `el_i`.
+		'''
+		row = self.element_rows[el_i]
+		cls = self._classes[int(row["kind"])]
+		tex_i = int(row["texture"])
+		hold = object.__new__(self.view_type(cls))
+		hold.__dict__.update(_store=self, _row=el_i, id=self._ids[el_i],
+			context=self.context)
+		if issubclass(cls, Textured):
+			hold.__dict__["texture"] = (self._textures[tex_i]
+				if tex_i >= 0 else None)
+		return hold
+
+	def markers_of(self, el_i: int, view: Optional[ElementView] = None
+		) -> Tuple[Dict[str, Marker], ...]:
+		'''Rebuild the markers of the element at row `el_i`, as a tuple of
+			`patches`, `points` and `offsets` dictionaries. Edits of them are
+			written back, and invalidate `view` if given.
+		'''
+		start = int(self.element_rows["start"][el_i])
+		count = int(self.element_rows["count"][el_i])
+		built: Tuple[Dict[str, Marker], ...] = ({}, {}, {})
+		for mk_i, record in enumerate(self.markers[start:start + count],
+			start):
+			mk_cls = MARKER_TYPES[record["type"]]
+			mk = mk_cls(**{
+				slot: Coord.of(*record[SLOT_COLUMNS[slot]].tolist())
+				for slot in mk_cls.__slots__})
+			object.__setattr__(mk, "_owner", MarkerRow(self, mk_i, mk, view))
+			if mk_cls is PointMarker:
+				built[1][self._fields[record["field"]]] = mk
+			elif mk_cls is OffsetMarker:
+				built[2][self._fields[record["field"]]] = mk
+			else:
+				built[0][self._fields[record["field"]]] = mk
+		return built
+
+	def write_back(self, mk_i: int, marker: Marker) -> None:
+		'''Store the fields of `marker` into the marker row `mk_i`.
+		'''
+		record = self.markers[mk_i]
+		for slot in marker.__slots__:
+			record[SLOT_COLUMNS[slot]] = getattr(marker, slot).pair
+
+	def ungrouped(self) -> "UngroupedView":
+		return UngroupedView(self)
+
+	def _column(self, el_rows: "np.ndarray", field: str,
+		column: str) -> Optional["np.ndarray"]:
+		'''Gather `column` of the marker named `field` of every element in
+			`el_rows`. Return None if some element does not have exactly
+			one such marker.
+		'''
+		if (fi := self._field_index.get(field)) is None:
+			return None
+		mk = self.markers[:self.n_markers]
+		picked = np.nonzero(np.isin(mk["element"], el_rows)
+			& (mk["field"] == fi))[0]
+		if len(picked) != len(el_rows):
+			return None
+		# marker rows are appended element by element, thus `picked` is
+		# aligned with `el_rows` (both ascending)
+		return mk[column][picked]
+
+	def _kinds(self) -> Generator[Tuple[type, "np.ndarray"], None, None]:
+		'''Yield each element class together with its element rows.
+		'''
+		kinds = self.element_rows["kind"][:self.n_elements]
+		for kind, cls in enumerate(self._classes):
+			yield cls, np.nonzero(kinds == kind)[0]
+
+	def _texture_names(self, el_rows: "np.ndarray") -> List[Optional[str]]:
+		names = [tex.bound_shortcut for tex in self._textures]
+		return [names[ti] if ti >= 0 else None for ti in
+			self.element_rows["texture"][el_rows].tolist()]
+
+	def _texture_sizes(self, el_rows: "np.ndarray") -> "np.ndarray":
+		sizes = np.array([tex.size for tex in self._textures], dtype="<i4")
+		return sizes[self.element_rows["texture"][el_rows]]
+
+	def to_objects(self) -> List[Dict[str, Dumpable]]:
+		'''Vectorized `Element.to_object` over all the elements, in the
+			order that they were appended.
+		'''
+		built: List[Optional[Dict[str, Dumpable]]] = [None] * self.n_elements
+		for cls, el_rows in self._kinds():
+			columns = self._object_columns(cls, el_rows)
+			if columns is None:
+				# not a built-in class, or markers are irregular
+				for el_i in el_rows.tolist():
+					built[el_i] = self.view(el_i).to_object()
+				continue
+			fields = cls._object_provider.fields
+			const = cls._object_provider.defaults
+			for row, el_i in enumerate(el_rows.tolist()):
+				built[el_i] = {fn: (columns[fn][row] if fn in columns
+					else const[fn]) for fn in fields}
+		return built
+
+	def _object_columns(self, cls: type,
+		el_rows: "np.ndarray") -> Optional[Dict[str, list]]:
+		'''Columns (as lists) of `to_object` results of all the elements of
+			class `cls`.
+		'''
+		if cls not in OBJECT_LAYOUTS:
+			return None
+		columns: Dict[str, list] = {
+			"name": [self._ids[el_i] for el_i in el_rows.tolist()]}
+		for key, (field, column) in OBJECT_LAYOUTS[cls].items():
+			if field is None:
+				columns[key] = self._texture_names(el_rows)
+				continue
+			values = self._column(el_rows, field, column)
+			if values is None:
+				return None
+			if column == "direction":
+				# `get_clip_direction`, expanded to (axis, sign)
+				on_x = values[:, 0] != 0
+				columns["axis"] = np.where(on_x, "x", "y").tolist()
+				columns["sign"] = np.where(on_x, values[:, 0] > 0,
+					values[:, 1] > 0).tolist()
+			else:
+				columns[key] = values.tolist()
+		return columns
+
+	def to_Java_like(self) -> List[Tuple[str, str]]:
+		'''Vectorized `Element.to_Java_like` over all the elements, in the
+			order that they were appended.
+		'''
+		built: List[Optional[Tuple[str, str]]] = [None] * self.n_elements
+		for cls, el_rows in self._kinds():
+			params = self._Java_parameters(cls, el_rows)
+			if params is None:
+				for el_i in el_rows.tolist():
+					built[el_i] = self.view(el_i).to_Java_like()
+				continue
+			cls_name, prefixes, numbers = params
+			template = cls._Java_like_provider.template
+			for row, el_i in enumerate(el_rows.tolist()):
+				built[el_i] = (cls_name, template.format(
+					camel_case(self._ids[el_i]),
+					", ".join((*prefixes[row], *map(str, numbers[row])))
+				))
+		return built
+
+	def _Java_parameters(self, cls: type, el_rows: "np.ndarray"
+		) -> Optional[Tuple[str, List[Tuple[str, ...]], List[list]]]:
+		'''The Java class name, the non-numeric leading parameters and the
+			integer parameters of all the elements of class `cls`.
+		'''
+		if cls not in JAVA_LAYOUTS:
+			return None
+		cls_name, field, build = JAVA_LAYOUTS[cls]
+		fetch = lambda column: self._column(el_rows, field, column)
+		numbers = build(fetch, len(el_rows))
+		if numbers is None:
+			return None
+		if issubclass(cls, Textured):
+			if (self.element_rows["texture"][el_rows] < 0).any():
+				# no texture to refer to, fall back to raise the same error
+				return None
+			prefixes = [('textures.get("{}")'.format(tn),)
+				for tn in self._texture_names(el_rows)]
+			numbers = np.column_stack(
+				(numbers, self._texture_sizes(el_rows)))
+		else:
+			prefixes = [()] * len(el_rows)
+		return cls_name, prefixes, numbers.tolist()
+
+
+
+class UngroupedView(mapping):
+	'''Read-only mapping of the elements of a `ColumnarStore` that belong
+		to no group.
+	'''
+
+	def __init__(self, store: ColumnarStore) -> None:
+		self.store = store
+
+	def _rows(self) -> List[int]:
+		groups = self.store.element_rows["group"][:self.store.n_elements]
+		return np.nonzero(groups < 0)[0].tolist()
+
+	def __getitem__(self, key: str) -> Element:
+		el_i = self.store._index[key]
+		if self.store.element_rows["group"][el_i] >= 0:
+			raise KeyError(key)
+		return self.store.view(el_i)
+
+	def __iter__(self) -> Iterator[str]:
+		return (self.store._ids[el_i] for el_i in self._rows())
+
+	def __len__(self) -> int:
+		return len(self._rows())
+
+
+
+OBJECT_LAYOUTS: Dict[type, Dict[str, Tuple[Optional[str], str]]] = {
+	Corner: {"at": ("at", "ul")},
+	Rectangle: {"ul": ("area", "ul"), "size": ("area", "size")},
+	ItemSlot: {"ul": ("ul", "ul")},
+	FluidTank: {"ul": ("area", "ul"), "size": ("area", "size"),
+		"direction": ("area", "direction")},
+	Crop: {"ul": ("ul", "ul"), "size": ("area", "size"),
+		"texture": (None, "texture")},
+	ProgressBar: {"ul": ("ul", "ul"), "size": ("area", "size"),
+		"direction": ("area", "direction"), "texture": (None, "texture")},
+	Atlas: {"ul": ("ul", "ul"), "grid": ("grid", "grid"),
+		"clip": ("grid", "clip"), "texture": (None, "texture")},
+}
+# to_object key -> (marker field, column)
+# a None marker field refers to the texture of the element
+
+
+def _stacked(*columns: Optional["np.ndarray"]) -> Optional["np.ndarray"]:
+	if any(c is None for c in columns):
+		return None
+	return np.column_stack(columns)
+
+
+JAVA_LAYOUTS: Dict[type, Tuple[str, str, Callable]] = {
+	Corner: ("Point", "at", lambda col, n: _stacked(col("ul"))),
+	Rectangle: ("Rect", "area",
+		lambda col, n: _stacked(col("ul"), col("size"))),
+	ItemSlot: ("Rect", "ul", lambda col, n: _stacked(col("ul"),
+		np.full((n, 2), 16))),
+	FluidTank: ("Rect", "area",
+		lambda col, n: _stacked(col("ul"), col("size"))),
+	Crop: ("TexturedUV", "area",
+		lambda col, n: _stacked(col("ul"), col("size"))),
+	ProgressBar: ("TexturedUV", "area",
+		lambda col, n: _stacked(col("ul"), col("size"))),
+	Atlas: ("AtlasUV", "grid", lambda col, n: None if col("ul") is None
+		else _stacked(
+			col("ul"),
+			col("grid")[:, 0] * col("clip")[:, 0], # total width
+			col("grid")[:, 1] * col("grid")[:, 1], # total height
+			col("grid")[:, 0],
+			col("grid")[:, 0] * col("grid")[:, 1], # total clip number
+		)),
+}
+# Java class name, the marker field providing the columns, and a function
+# to build the integer parameters out of the columns
+# the layouts strictly follow the `to_Java_like` methods
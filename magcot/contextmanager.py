@@ -15,7 +15,7 @@ class CurrentContext:
 	'''
 
 	__instance: "Optional[Self]" = None
-	__slots__ = ("_context", "_namespaces")
+	__slots__ = ("_context", "_namespaces", "_layers")
 
 	def __new__(cls):
 		'''To make this singleton.
@@ -24,6 +24,9 @@ class CurrentContext:
 			hold = super().__new__(cls)
 			hold._context: "List[GuiAnnotation]" = []
 			hold._namespaces: "Dict[str, str]" = {}
+			hold._layers: "Dict[str, List[str]]" = {}
+			# namespace -> "assets" folders stacked over the one defined,
+			# bottom first
 			cls.__instance = hold
 		return cls.__instance
 
@@ -44,21 +47,49 @@ class CurrentContext:
 		if len(self._context) > 0:
 			self._context.pop()
 
-	def define_namespace(self, ns: str, path: str) -> None:
-		'''Define a namespace. `path` must be a path pointing to a folder
-			named "assets".
-		'''
+	@staticmethod
+	def _validated_assets(ns: str, path: str) -> str:
 		if os.path.basename(path) != "assets":
 			raise ValueError("`path` must be an 'assets' folder.")
 		if not os.path.isdir(path):
 			raise FileNotFoundError(f"'{path}' does not exist.")
 		if set(ns) - set("1234567890" "abcdefghijklmnopqrstuvwxyz" "-_."):
 			raise ValueError("Bad namespace name.")
-		self._namespaces[ns] = path.replace("\\", "/")
+		return path.replace("\\", "/")
+
+	def define_namespace(self, ns: str, path: str) -> None:
+		'''Define a namespace. `path` must be a path pointing to a folder
+			named "assets". Layers stacked over the namespace before are
+			removed.
+		'''
+		self._namespaces[ns] = self._validated_assets(ns, path)
+		self._layers.pop(ns, None)
+
+	def stack_assets(self, ns: str, path: str) -> None:
+		'''Stack another "assets" folder over a defined namespace, e.g. of
+			an addon or a resource pack. Its files override those of the
+			namespace and of the layers stacked before.
+		'''
+		if ns not in self._namespaces:
+			raise KeyError(f"Namespace '{ns}' is not defined.")
+		self._layers.setdefault(ns, []).append(
+			self._validated_assets(ns, path))
+
+	def asset_roots(self, ns: str) -> "List[str]":
+		'''The "assets" folders of a namespace, bottom first.
+		'''
+		return [self._namespaces[ns], *self._layers.get(ns, ())]
 
 
 
 def define_namespace(ns: str, path: str) -> None:
 	'''Wrapper of `CurrentContext.define_namespace`, can be used externally.
 	'''
-	CurrentContext().define_namespace(ns, path)
\ No newline at end of file
+	CurrentContext().define_namespace(ns, path)
+
+
+
+def stack_assets(ns: str, path: str) -> None:
+	'''Wrapper of `CurrentContext.stack_assets`, can be used externally.
+	'''
+	CurrentContext().stack_assets(ns, path)
\ No newline at end of file
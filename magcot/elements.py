@@ -5,13 +5,18 @@ hierarchy: Coord -> Marker -> Element
 
 from .contextmanager import *
 from .providers import *
+from .spatial import GridIndex, Region, find_intersections
 # # #
+from collections.abc import Mapping as mapping, \
+	MutableMapping as mutable_mapping
+from functools import wraps
+import hashlib
 import json
-from shutil import copytree
 
 
 
 hook_["namespaces"] = CurrentContext()._namespaces
+hook_["layers"] = CurrentContext()._layers
 
 
 
@@ -20,30 +25,77 @@ class Coord:
 	# # #
 	A coordinate is a pair of integers, used to describe a point,
 		a width-by-height area, or x-y offset.
+	Instances are immutable, and small ones (both integers within
+		`INTERN_RANGE`) are interned, i.e. identical values share one
+		instance across all annotations.
 	'''
 
 	__slots__ = ("_0", "_1")
+	INTERN_RANGE: ClassVar[range] = range(-32, 257)
+	# typical GUI positions, sizes and clip directions
+	_interned: ClassVar[Dict[Tuple[int, int], "Coord"]] = {}
+
+	def __new__(cls, *args: Any) -> Self:
+		'''The common cases (two integers, or a 2-tuple of integers) are
+			handled here directly; the others go through `convert`.
+		'''
+		if len(args) == 2:
+			if type(args[0]) is int and type(args[1]) is int:
+				return cls.of(*args)
+		elif len(args) == 1 and type(args[0]) is tuple and len(args[0]) == 2:
+			first, last = args[0]
+			if type(first) is int and type(last) is int:
+				return cls.of(first, last)
+		return cls.convert(*args)
+
+	@classmethod
+	def of(cls, first: int, last: int) -> Self:
+		'''Fast constructor with two integers, neither type-checked nor
+			dispatched.
+		'''
+		if (hold := cls._interned.get((first, last))) is not None:
+			return hold
+		hold = object.__new__(cls)
+		object.__setattr__(hold, "_0", first)
+		object.__setattr__(hold, "_1", last)
+		if first in cls.INTERN_RANGE and last in cls.INTERN_RANGE:
+			cls._interned[(first, last)] = hold
+		return hold
 
 	@singledispatchmethod
-	def __init__(self, *args) -> NoReturn:
+	@classmethod
+	def convert(cls, *args) -> NoReturn:
 		raise TypeError(f"Cannot convert {args[0].__class__} and such "
 			"into `Coord`.")
 
-	@__init__.register
-	def _(self, first: int, last: int) -> None:
-		'''Initialize with two integers.
+	@convert.register(int)
+	@classmethod
+	def _(cls, first: int, last: int) -> Self:
+		'''Initialize with two integers (`bool` and other subclasses of
+			`int` are converted).
 		'''
-		self._0, self._1 = first, last
+		return cls.of(int(first), int(last))
 
-	@__init__.register
-	def _(self, pair: iterable) -> None:
+	@convert.register(iterable)
+	@classmethod
+	def _(cls, pair: iterable) -> Self:
 		'''Initialize with a pair of integers in an iterable.
 		# # #
 		`pair`: theoretically an iterable with two integer elements,
 				but who knows?
 		'''
-		pair = map(int, pair)
-		self._0, self._1, *_ = pair
+		first, last, *_ = map(int, pair)
+		return cls.of(first, last)
+
+	def __setattr__(self, name: str, value: Any) -> NoReturn:
+		raise AttributeError("`Coord` instances are immutable.")
+
+	def __delattr__(self, name: str) -> NoReturn:
+		raise AttributeError("`Coord` instances are immutable.")
+
+	def __reduce__(self) -> Tuple[Callable, Tuple[int, int]]:
+		# `__new__` cannot be called without arguments, as pickle does
+		return (self.__class__.of, (self._0, self._1))
 
 	@property
 	def pair(self) -> Tuple[int, int]:
@@ -62,11 +114,19 @@ class Coord:
 	def __repr__(self) -> str:
 		return "@" + self.pair.__repr__()
 
+	def __eq__(self, other: Any) -> bool:
+		if isinstance(other, Coord):
+			return self._0 == other._0 and self._1 == other._1
+		return NotImplemented
+
+	def __hash__(self) -> int:
+		return hash((self._0, self._1))
+
 	def __add__(self, other: Self) -> Self:
-		return Coord(self._0 + other._0, self._1 + other._1)
+		return Coord.of(self._0 + other._0, self._1 + other._1)
 
 	def __sub__(self, other: Self) -> Self:
-		return Coord(self._0 - other._0, self._1 - other._1)
+		return Coord.of(self._0 - other._0, self._1 - other._1)
 
 	def __iter__(self) -> Generator[int, None, None]:
 		yield from self.pair
@@ -77,20 +137,39 @@ class Marker:
 	'''Marker base class, use to store positions and sizes of UI elements.
 	'''
 	
-	__slots__ = ()
-	# here defines all the data fields
+	__slots__ = ("_owner",)
+	# subclasses define all the data fields here
 	# all fields (e.g. point x-y, size w-h, clip direction) are stored
 	# with `Coord` instances
+	# `_owner` is the element this marker is added to, if any
 	_HTML_provider: Optional[HtmlProvider] = None
 	# provides HTML elements
+	HTML_kind: Optional[str] = None
+	# kind of rows in the marker payload of webpages, see `to_HTML_row`
 
 	def __init__(self, **data: Union[Coord, iterable]) -> None:
-		if (missing := set(self.__slots__) - set(data)):
+		assure = Coord.assure
+		set_field = object.__setattr__
+		# no owner to invalidate yet
+		try:
+			for field in self.__slots__:
+				set_field(self, field, assure(data[field]))
+		except KeyError:
 			# `data` does not cover all the fields
+			missing = set(self.__slots__) - set(data)
 			raise ValueError("All fields should be provided, "
-				"but {} are missing.".format(missing.__repr__()))
-		for field in self.__slots__:
-			setattr(self, field, Coord.assure(data[field]))
+				"but {} are missing.".format(missing.__repr__())) from None
+
+	def __setattr__(self, name: str, value: Any) -> None:
+		'''Fields are converted to `Coord`, and the element owning this
+			marker is invalidated.
+		'''
+		if name == "_owner":
+			object.__setattr__(self, name, value)
+			return
+		object.__setattr__(self, name, Coord.assure(value))
+		if (owner := getattr(self, "_owner", None)) is not None:
+			owner.invalidate()
 
 	def __repr__(self) -> str:
 		return "{}({})".format(
@@ -103,6 +182,10 @@ class Marker:
 		raise NotImplementedError("Only `ClippablePatchMarker` has this "
 			"method, this ({}) does not.".format(self.__class__))
 
+	def get_region(self) -> NoReturn:
+		raise NotImplementedError("Only patch-like markers have this "
+			"method, this ({}) does not.".format(self.__class__))
+
 	def to_HTML(self, *args, **data) -> NoReturn:
 		'''Write lines of HTML elements. Note that this usually requires
 			external input data, such as colors, ordinals, etc.
@@ -113,6 +196,21 @@ class Marker:
 		'''
 		raise NotImplementedError("This must be overridden.")
 
+	def to_HTML_row(self, id_: str, color: str, symbol: str, z_index: Real,
+		additional_classes: List[str], **ref: "PointMarker") -> List[Dumpable]:
+		'''A row of the marker payload of webpages, read by the page
+			scripts instead of an HTML element:
+			[id, kind, symbol, color, z-index, additional classes, x, y, ...]
+			where the rest are given by `HTML_values`.
+		'''
+		if z_index.__class__ is float:
+			z_index = round(z_index, 5)
+		return [id_, self.HTML_kind, symbol, color, z_index,
+			" ".join(additional_classes), *self.HTML_values(**ref)]
+
+	def HTML_values(self) -> NoReturn:
+		raise NotImplementedError("This must be overridden.")
+
 
 class PointMarker(Marker):
 	'''Used to mark a point.
@@ -124,6 +222,10 @@ class PointMarker(Marker):
 	__slots__ = ("at",)
 	_HTML_provider = HtmlProvider("div", ["element", "point"],
 		"logPointInfo(this)")
+	HTML_kind = "point"
+
+	def HTML_values(self) -> List[int]:
+		return [self.at._0, self.at._1]
 
 	def to_HTML(self, id_: str, color: str, symbol: str, z_index: Real,
 		additional_classes: List[str], suffix: str) -> str:
@@ -146,6 +248,10 @@ class OffsetMarker(Marker):
 	__slots__ = ("at",)
 	_HTML_provider = HtmlProvider("div", ["element", "point"],
 		"logOffsetInfo(this)")
+	HTML_kind = "offset"
+
+	def HTML_values(self, ref: PointMarker) -> List[int]:
+		return list(self.at + ref.at)
 
 	def to_HTML(self, id_: str, color: str, symbol: str, z_index: Real,
 		ref: PointMarker, additional_classes: List[str], suffix: str) -> str:
@@ -171,6 +277,18 @@ class GridMarker(Marker):
 	__slots__ = ("ul", "grid", "clip")
 	_HTML_provider = HtmlProvider("div", ["element", "area grid"],
 		"logGridInfo(this)")
+	HTML_kind = "grid"
+
+	def HTML_values(self) -> List[int]:
+		return [self.ul._0, self.ul._1, self.clip._0, self.clip._1,
+			self.grid._0, self.grid._1]
+
+	def get_region(self) -> Region:
+		'''The whole area of the grid, as (x0, y0, x1, y1).
+		'''
+		return (self.ul._0, self.ul._1,
+			self.ul._0 + self.grid._0 * self.clip._0,
+			self.ul._1 + self.grid._1 * self.clip._1)
 
 	def to_HTML(self, id_: str, color: str, symbol: str, z_index: Real,
 		additional_classes: List[str], suffix: str) -> str:
@@ -195,6 +313,16 @@ class PatchMarker(Marker):
 	__slots__ = ("ul", "size")
 	_HTML_provider = HtmlProvider("div", ["element", "area patch"],
 		"logPatchInfo(this)")
+	HTML_kind = "patch"
+
+	def HTML_values(self) -> List[int]:
+		return [self.ul._0, self.ul._1, self.size._0, self.size._1]
+
+	def get_region(self) -> Region:
+		'''The area of the patch, as (x0, y0, x1, y1).
+		'''
+		return (self.ul._0, self.ul._1,
+			self.ul._0 + self.size._0, self.ul._1 + self.size._1)
 
 	def to_HTML(self, id_: str, color: str, symbol: str, z_index: Real,
 		additional_classes: List[str], suffix: str) -> str:
@@ -220,6 +348,20 @@ class ClippablePatchMarker(Marker):
 	__slots__ = ("ul", "size", "direction")
 	_HTML_provider = HtmlProvider("div", ["element", "area cpatch"],
 		"logClippablePatchInfo(this)")
+	HTML_kind = "cpatch"
+	DIRECTIONS: ClassVar[Dict[str, Tuple[str, str]]] = {
+		"x": ("left", "right"), "y": ("bottom", "top")}
+
+	def HTML_values(self) -> List[Union[int, str]]:
+		axis, sign = self.get_clip_direction()
+		return [self.ul._0, self.ul._1, self.size._0, self.size._1,
+			self.DIRECTIONS[axis][sign]]
+
+	def get_region(self) -> Region:
+		'''The area of the patch, as (x0, y0, x1, y1).
+		'''
+		return (self.ul._0, self.ul._1,
+			self.ul._0 + self.size._0, self.ul._1 + self.size._1)
 
 	def get_clip_direction(self) -> Optional[Tuple[str, bool]]:
 		'''Get the actual clip direction specified by `self.direction`.
@@ -242,17 +384,25 @@ class ClippablePatchMarker(Marker):
 		additional_classes: List[str], suffix: str) -> str:
 		'''Needs external `id_`, `color`, and `symbol`.
 		'''
-		DIRECTIONS = {"x": ("left", "right"), "y": ("bottom", "top")}
 		axis, sign = self.get_clip_direction()
 		return self._HTML_provider(id_, symbol, additional_classes,
 			z_index=z_index, suffix=suffix,
 			color=color, x=self.ul._0, y=self.ul._1,
 			w=self.size._0, h=self.size._1,
-			direction=DIRECTIONS[axis][sign]
+			direction=self.DIRECTIONS[axis][sign]
 		)
 
 
 
+MARKER_KINDS: Dict[type, str] = {
+	PointMarker: "points", OffsetMarker: "offsets", PatchMarker: "patches",
+	ClippablePatchMarker: "patches", GridMarker: "patches"
+}
+# which dictionary of `Element` a marker goes to, see `Element.add_data`
+# used to skip the dispatch when adding trusted markers
+
+
+
 class Textured:
 	'''Data class used to provide textured elements with texture-related
 		functions.
@@ -293,6 +443,58 @@ class Textured:
 	
 
 
+ELEMENT_TYPES: Dict[str, type] = {}
+# the "type" field of `Element.to_object` -> the element class
+# filled when subclasses are defined
+
+
+
+def copied(value: Any) -> Any:
+	'''A copy of `value` as deep as its dictionaries, lists and tuples,
+		i.e. the containers of exports; anything else is shared. Memoized
+		exports are handed out copied, so that callers may mutate them.
+	'''
+	if isinstance(value, dict):
+		return {k: copied(v) for k, v in value.items()}
+	if isinstance(value, list):
+		return [copied(v) for v in value]
+	if type(value) is tuple:
+		return tuple(copied(v) for v in value)
+	return value
+
+
+
+def memoized_export(method: Callable) -> Callable:
+	'''Memoize an export method of `Element` (`to_object`, etc.) until the
+		element is invalidated. Only the latest result of each method is
+		kept, keyed by the arguments and the texture of the element.
+	'''
+	name = method.__name__
+	if getattr(method, "__memoized__", False):
+		return method
+
+	def frozen(value: Any) -> Hashable:
+		return tuple(value) if isinstance(value, list) else value
+
+	@wraps(method)
+	def wrapped(self, *args, **kwargs) -> Any:
+		texture = self.__dict__.get("texture")
+		key = (tuple(frozen(v) for v in args),
+			tuple((k, frozen(v)) for k, v in kwargs.items()),
+			id(texture), getattr(texture, "bound_shortcut", None))
+		# a texture may be re-bound to another name
+		exports = self.__dict__.setdefault("_exports", {})
+		if (found := exports.get(name)) is not None and found[0] == key:
+			return copied(found[1])
+		built = method(self, *args, **kwargs)
+		exports[name] = (key, built)
+		return copied(built)
+
+	wrapped.__memoized__ = True
+	return wrapped
+
+
+
 class Element:
 	'''UI element definition base class, having the function to provide
 		simple foreign codes.
@@ -317,16 +519,25 @@ class Element:
 	# provides Java-like assignment statements
 	ΔZ: int = 1
 	# the z-index increment between two juxtaposed HTML elements.]
+	_memoized: Tuple[str, ...] = ("to_object", "to_Java_like", "to_HTML",
+		"to_HTML_rows")
+	# export methods memoized until the element is invalidated, also when
+	# overridden by subclasses
+	overlap_whitelist: FrozenSet[str] = frozenset()
+	# IDs of elements (or "#" + group IDs) this element may overlap with
+	# see `allow_overlap`
 
 	def __init__(self, id_: str, context: Optional["GuiAnnotation"] = None,
-		**markers: Marker) -> None:
+		*, trusted: bool = False, **markers: Marker) -> None:
 		'''Initialize.
 		# # #
 		`context`: current (annotation) context. Will try to get current
 			context if this parameter is None. `self.context` can still
 			be None finally, if no `GuiAnnotation` instance be created.
+		`trusted`: skip the ID validation and the type checks of markers.
+			Used by bulk constructors, which validate a whole batch at once.
 		'''
-		self.id = validated_id(id_)
+		self.id = id_ if trusted else validated_id(id_)
 		if context is None:
 			self.context = CurrentContext().get()
 		else:
@@ -335,6 +546,10 @@ class Element:
 		self.patches: Dict[str,
 			Union[PatchMarker, ClippablePatchMarker, GridMarker]] = {}
 		self.offsets: Dict[str, OffsetMarker] = {}
+		if trusted:
+			for fn in self._user_fields:
+				self._install(markers[fn], fn)
+			return
 		for fn, field_type in self._user_fields.items():
 			intended_field_data = markers[fn]
 			if not isinstance(intended_field_data, field_type):
@@ -344,6 +559,46 @@ class Element:
 				))
 			self.add_data(markers[fn], fn)
 
+	def __init_subclass__(cls, **kwargs: Any) -> None:
+		super().__init_subclass__(**kwargs)
+		if "_object_provider" in cls.__dict__ and \
+			"type" in cls._object_provider.defaults:
+			ELEMENT_TYPES[cls._object_provider.defaults["type"]] = cls
+		for name in cls._memoized:
+			if name in cls.__dict__:
+				setattr(cls, name, memoized_export(cls.__dict__[name]))
+
+	def invalidate(self) -> None:
+		'''Mark this element dirty, i.e. drop its memoized exports. Called
+			when its markers change. The context is only told if this element
+			is annotated in it, not while it is being created.
+		'''
+		self.__dict__.pop("_exports", None)
+		if isinstance(getattr(self, "context", None), GuiAnnotation) and \
+			self.context._registered(self):
+			self.context.touch()
+			self.context._regions_changed(self.id)
+
+	@property
+	def dirty(self) -> bool:
+		'''Whether nothing has been exported since the last change.
+		'''
+		return not self.__dict__.get("_exports")
+
+	def _install(self, marker: Marker, field_name: str) -> None:
+		'''Add a marker as `add_data` does, without the type dispatch and
+			without invalidating. Used on trusted paths.
+		'''
+		getattr(self, MARKER_KINDS[marker.__class__])[field_name] = marker
+		self.__dict__[field_name] = marker
+		object.__setattr__(marker, "_owner", self)
+
+	def _adopt(self, marker: Marker) -> None:
+		'''Own a newly added marker.
+		'''
+		object.__setattr__(marker, "_owner", self)
+		self.invalidate()
+
 	@classmethod
 	def of(cls, id_: str, *args: Any,
 		context: Optional["GuiAnnotation"]) -> NoReturn:
@@ -352,6 +607,13 @@ class Element:
 		'''
 		raise NotImplementedError("This must be overridden.")
 
+	@classmethod
+	def from_object(cls, obj: Dict[str, Dumpable],
+		context: Optional["GuiAnnotation"] = None) -> NoReturn:
+		'''The inverse of `to_object`. Must be overridden by subclasses.
+		'''
+		raise NotImplementedError("This must be overridden.")
+
 	def __repr__(self) -> str:
 		return "{}(\n\t{}\n)".format(
 			self.__class__.__name__,
@@ -368,26 +630,56 @@ class Element:
 	def _(self, marker: PointMarker, field_name: str) -> None:
 		self.points[field_name] = marker
 		self.__dict__[field_name] = marker
+		self._adopt(marker)
 
 	@add_data.register
 	def _(self, marker: PatchMarker, field_name: str) -> None:
 		self.patches[field_name] = marker
 		self.__dict__[field_name] = marker
+		self._adopt(marker)
 
 	@add_data.register
 	def _(self, marker: ClippablePatchMarker, field_name: str) -> None:
 		self.patches[field_name] = marker
 		self.__dict__[field_name] = marker
+		self._adopt(marker)
 
 	@add_data.register
 	def _(self, marker: GridMarker, field_name: str) -> None:
 		self.patches[field_name] = marker
 		self.__dict__[field_name] = marker
+		self._adopt(marker)
 
 	@add_data.register
 	def _(self, marker: OffsetMarker, field_name: str) -> None:
 		self.offsets[field_name] = marker
 		self.__dict__[field_name] = marker
+		self._adopt(marker)
+
+	def allow_overlap(self, *others: str) -> Self:
+		'''Whitelist intended overlaps with other elements, given by IDs,
+			or group IDs starting with "#". Patches of the same element are
+			always allowed to overlap.
+		'''
+		self.overlap_whitelist = self.overlap_whitelist | frozenset(
+			("#" + validated_id(o[1:])) if o.startswith("#")
+			else validated_id(o) for o in others)
+		return self
+
+	def get_texture_name(self) -> Optional[str]:
+		'''The name of the texture this element is on, in its context. The
+			main texture ("") for untextured elements.
+		'''
+		if isinstance(self, Textured):
+			return (self.texture.bound_shortcut
+				if self.texture is not None else None)
+		return ""
+
+	def get_regions(self) -> Dict[str, Region]:
+		'''Regions of all the patches, as (x0, y0, x1, y1).
+		'''
+		return {pt_name: ptch.get_region()
+			for pt_name, ptch in self.patches.items()}
 
 	def to_object(self) -> NoReturn:
 		'''Convert a instance to a JSON object (as Python dictionary) with
@@ -404,37 +696,56 @@ class Element:
 		'''
 		raise NotImplementedError("This must be overridden.")
 
-	def to_HTML(self, color: str, symbol: str, additional_classes: List[str],
-		z_index: Real = 10) -> Tuple[str, ...]:
-		'''Calls `Marker.to_HTML`.
-		On this level, parameter `id_` is resolved, but `color`, `symbol`,
-			and `z-index` still need to be provided externally.
+	def _HTML_markers(self, z_index: Real
+		) -> Iterator[Tuple[Marker, str, str, Real, Dict[str, Marker]]]:
+		'''Yield the markers in the order they are put on webpages, with
+			their IDs, names, z-indices, and the reference points of offsets.
 		'''
-		built: List[str] = []
-		built.append(f"<!-- {self.__class__.__name__} `{self.id}` -->")
-		# add a comment line
 		el_count = -1 # element counter
 		for pt_name, ptch in self.patches.items():
 			el_count += 1
-			built.append(ptch.to_HTML(f"{self.id}--{pt_name}", color, symbol,
+			yield (ptch, f"{self.id}--{pt_name}", pt_name,
 				self.context.z_index_start["patch"] + z_index
-				+ el_count * self.ΔZ, additional_classes, pt_name))
+				+ el_count * self.ΔZ, {})
 		for pn_name, pn in self.points.items():
 			el_count += 1
-			built.append(pn.to_HTML(f"{self.id}--{pn_name}", color, symbol,
+			yield (pn, f"{self.id}--{pn_name}", pn_name,
 				self.context.z_index_start["point"] + z_index
-				+ el_count * self.ΔZ, additional_classes, pn_name))
+				+ el_count * self.ΔZ, {})
 		for ofs_name, ofs in self.offsets.items():
 			# `OffsetMarker` must provide a reference point (the local
 			# origin) to calculate the actual x-y coordinate
 			# they are still points
 			el_count += 1
-			built.append(ofs.to_HTML(f"{self.id}--{ofs_name}", color, symbol,
+			yield (ofs, f"{self.id}--{ofs_name}", ofs_name,
 				self.context.z_index_start["point"] + z_index
-				+ el_count * self.ΔZ, ref=self.points["ul"],
-				additional_classes=additional_classes, suffix=ofs_name))
+				+ el_count * self.ΔZ, {"ref": self.points["ul"]})
+
+	@memoized_export
+	def to_HTML(self, color: str, symbol: str, additional_classes: List[str],
+		z_index: Real = 10) -> Tuple[str, ...]:
+		'''Calls `Marker.to_HTML`.
+		On this level, parameter `id_` is resolved, but `color`, `symbol`,
+			and `z-index` still need to be provided externally.
+		'''
+		built: List[str] = []
+		built.append(f"<!-- {self.__class__.__name__} `{self.id}` -->")
+		# add a comment line
+		for mk, mk_id, mk_name, mk_z, ref in self._HTML_markers(z_index):
+			built.append(mk.to_HTML(mk_id, color, symbol, mk_z,
+				additional_classes=additional_classes, suffix=mk_name, **ref))
 		return tuple(built)
 
+	@memoized_export
+	def to_HTML_rows(self, color: str, symbol: str,
+		additional_classes: List[str], z_index: Real = 10
+	) -> Tuple[List[Dumpable], ...]:
+		'''Calls `Marker.to_HTML_row`, in the same way as `to_HTML`.
+		'''
+		return tuple(mk.to_HTML_row(mk_id, color, symbol, mk_z,
+			additional_classes, **ref)
+			for mk, mk_id, _, mk_z, ref in self._HTML_markers(z_index))
+
 
 class Corner(Element):
 	'''Single points.
@@ -451,6 +762,11 @@ class Corner(Element):
 			context = CurrentContext().get()
 		return cls(id_, context, at=PointMarker(at=at))
 
+	@classmethod
+	def from_object(cls, obj: Dict[str, Dumpable],
+		context: Optional["GuiAnnotation"] = None) -> Self:
+		return cls.of(obj["name"], obj["at"], context=context)
+
 	def to_object(self) -> Dict[str, Dumpable]:
 		return self._object_provider(
 			name=self.id, at=self.at.at
@@ -478,6 +794,11 @@ class Rectangle(Element):
 			context = CurrentContext().get()
 		return cls(id_, context, area=PatchMarker(ul=ul, size=size))
 
+	@classmethod
+	def from_object(cls, obj: Dict[str, Dumpable],
+		context: Optional["GuiAnnotation"] = None) -> Self:
+		return cls.of(obj["name"], obj["ul"], obj["size"], context=context)
+
 	def to_object(self) -> Dict[str, Dumpable]:
 		return self._object_provider(
 			name=self.id, ul=self.area.ul, size=self.area.size
@@ -501,12 +822,13 @@ class ItemSlot(Element):
 
 	def __init__(self, id_: str,
 		context: Optional["GuiAnnotation"] = None,
-		**markers: Marker) -> None:
-		super().__init__(id_, context, **markers)
-		self.add_data(
-			PatchMarker(ul=markers["ul"].at, size=(16, 16)),
-			field_name="area"
-		)
+		*, trusted: bool = False, **markers: Marker) -> None:
+		super().__init__(id_, context, trusted=trusted, **markers)
+		area = PatchMarker(ul=markers["ul"].at, size=(16, 16))
+		if trusted:
+			self._install(area, "area")
+		else:
+			self.add_data(area, field_name="area")
 
 	@classmethod
 	def of(cls, id_: str, ul: Tuple[int, int],
@@ -515,6 +837,37 @@ class ItemSlot(Element):
 			context = CurrentContext().get()
 		return cls(id_, context, ul=PointMarker(at=ul))
 
+	@classmethod
+	def grid(cls, id_pattern: str, ul: Tuple[int, int], rows: int, cols: int,
+		pitch: Tuple[int, int] = (18, 18),
+		context: Optional["GuiAnnotation"] = None) -> List[Self]:
+		'''Create `rows` * `cols` item slots arranged in a regular grid, row
+			by row. The IDs are validated once as a batch.
+		# # #
+		`id_pattern`: a format string of IDs, given `row`, `col` (both from
+			0) and `i` (the index of the slot), e.g. "inv_{row}_{col}".
+		`ul`: the x-y coordinate of the upper left slot.
+		`pitch`: the distances between two adjacent slots, horizontally and
+			vertically. 18 * 18 for the vanilla slots.
+		'''
+		if context is None:
+			context = CurrentContext().get()
+		x0, y0 = Coord.assure(ul)
+		dx, dy = Coord.assure(pitch)
+		cells = [(r, c) for r in range(rows) for c in range(cols)]
+		ids = validated_ids(id_pattern.format(row=r, col=c, i=i)
+			for i, (r, c) in enumerate(cells))
+		return [
+			cls(id_, context, trusted=True,
+				ul=PointMarker(at=Coord.of(x0 + c * dx, y0 + r * dy)))
+			for id_, (r, c) in zip(ids, cells)
+		]
+
+	@classmethod
+	def from_object(cls, obj: Dict[str, Dumpable],
+		context: Optional["GuiAnnotation"] = None) -> Self:
+		return cls.of(obj["name"], obj["ul"], context=context)
+
 	def to_object(self) -> Dict[str, Dumpable]:
 		return self._object_provider(
 			name=self.id, ul=self.ul.at
@@ -550,6 +903,12 @@ class FluidTank(Element):
 			)
 		)
 
+	@classmethod
+	def from_object(cls, obj: Dict[str, Dumpable],
+		context: Optional["GuiAnnotation"] = None) -> Self:
+		return cls.of(obj["name"], obj["ul"], obj["size"],
+			direction_string(obj["axis"], obj["sign"]), context=context)
+
 	def to_object(self) -> Dict[str, Dumpable]:
 		_axis, _sign = self.area.get_clip_direction()
 		return self._object_provider(
@@ -591,6 +950,12 @@ class Crop(Element, Textured):
 			area=PatchMarker(ul=ul, size=size)
 		)
 
+	@classmethod
+	def from_object(cls, obj: Dict[str, Dumpable],
+		context: Optional["GuiAnnotation"] = None) -> Self:
+		return cls.of(obj["name"], obj["ul"], obj["size"], obj["texture"],
+			context=context)
+
 	def to_object(self) -> Dict[str, Dumpable]:
 		return self._object_provider(
 			name=self.id, ul=self.ul.at, size=self.area.size,
@@ -642,6 +1007,13 @@ class ProgressBar(Element, Textured):
 			)
 		)
 
+	@classmethod
+	def from_object(cls, obj: Dict[str, Dumpable],
+		context: Optional["GuiAnnotation"] = None) -> Self:
+		return cls.of(obj["name"], obj["ul"], obj["size"],
+			direction_string(obj["axis"], obj["sign"]), obj["texture"],
+			context=context)
+
 	def to_object(self) -> Dict[str, Dumpable]:
 		_axis, _sign = self.area.get_clip_direction()
 		return self._object_provider(
@@ -685,6 +1057,12 @@ class Atlas(Element, Textured):
 			grid=GridMarker(ul=ul, grid=grid, clip=clip)
 		)
 
+	@classmethod
+	def from_object(cls, obj: Dict[str, Dumpable],
+		context: Optional["GuiAnnotation"] = None) -> Self:
+		return cls.of(obj["name"], obj["ul"], obj["grid"], obj["clip"],
+			obj["texture"], context=context)
+
 	def to_object(self) -> Dict[str, Dumpable]:
 		return self._object_provider(
 			name=self.id, ul=self.ul.at, grid=self.grid.grid,
@@ -707,6 +1085,73 @@ class Atlas(Element, Textured):
 
 
 
+class LazyElements(mutable_mapping):
+	'''Mapping of element IDs to elements, where elements restored from
+		exported data are kept as raw objects (as `Element.to_object`
+		returns) until they are accessed.
+	# # #
+	`raw`: a function giving the raw object of the i-th element.
+	`context`: the annotation that elements are created in.
+	Mappings made by `subset` share the elements already materialized.
+	'''
+
+	def __init__(self, ids: Iterable[str],
+		raw: Callable[[int], Dict[str, Dumpable]],
+		context: "GuiAnnotation") -> None:
+		self._order: Dict[str, int] = {el_id: i for i, el_id in enumerate(ids)}
+		# element ID -> index for `raw`, -1 for elements added afterwards
+		self._raw = raw
+		self._built: Dict[str, Element] = {}
+		self.context = context
+
+	def subset(self, ids: Iterable[str]) -> Self:
+		hold = self.__class__((), self._raw, self.context)
+		hold._order = {el_id: self._order[el_id] for el_id in ids}
+		hold._built = self._built
+		return hold
+
+	def __getitem__(self, key: str) -> Element:
+		if (found := self._built.get(key)) is not None:
+			return found
+		obj = self._raw(self._order[key])
+		found = self._built[key] = ELEMENT_TYPES[obj["type"]].from_object(
+			obj, self.context)
+		return found
+
+	def peek(self, key: str) -> Optional[Element]:
+		'''The element of `key` if already created, without creating it.
+		'''
+		return self._built.get(key)
+
+	def __setitem__(self, key: str, element: Element) -> None:
+		self._built[key] = element
+		self._order.setdefault(key, -1)
+
+	def __delitem__(self, key: str) -> None:
+		del self._order[key]
+		self._built.pop(key, None)
+
+	def __iter__(self) -> Iterator[str]:
+		return iter(self._order)
+
+	def __len__(self) -> int:
+		return len(self._order)
+
+	def __contains__(self, key: Any) -> bool:
+		return key in self._order
+
+	def iter_objects(self) -> Generator[Dict[str, Dumpable], None, None]:
+		'''`Element.to_object` of all the elements, where the raw objects of
+			elements not yet materialized are used directly.
+		'''
+		for el_id, el_i in self._order.items():
+			if (el := self._built.get(el_id)) is not None:
+				yield el.to_object()
+			else:
+				yield copied(self._raw(el_i))
+
+
+
 class GuiAnnotation:
 	'''The main class to operate GUI annotation workflows.
 	# # #
@@ -714,6 +1159,10 @@ class GuiAnnotation:
 		`ordinal_style` and `color_series` to annotate a GUI.
 	`color_series`: a list of color series names defined in
 		`providers.color_series`.
+	`storage`: how the elements are stored.
+		"object": as `Element` instances.
+		"columnar": as NumPy structured arrays (see `columnar.ColumnarStore`),
+			`elements` will then provide lightweight views. NumPy required.
 	'''
 
 	def __init__(self, main_texture: Union[Texture, str],
@@ -721,15 +1170,38 @@ class GuiAnnotation:
 		ordinal_style: str = "qianziwen",
 		color_series: List[str] = ["red", "green", "blue", "yellow",
 			"purple", "orange", "cyan", "crimson", "earthy",
-			"indigo", "dim"]
+			"indigo", "dim"],
+		storage: Literal["object", "columnar"] = "object"
 	) -> None:
 		self.textures: Dict[str, Texture] = {}
 		self.groups: Dict[str, List[str]] = {}
 		self._current_group: Optional[str] = None
 		self.layouts: Dict[str, Layout] = {}
-		self.elements: Dict[str, Element] = {}
 		self.element_order: List[Tuple[Element, ...]] = []
-		self.ungrouped_elements: Dict[str, Element] = {}
+		self.spatial_indices: Dict[str, GridIndex] = {}
+		# texture name -> index over the regions of elements on it
+		self._revision = 0
+		# increased whenever anything that is exported changes
+		self._exports: Dict[Hashable, Tuple[int, Any]] = {}
+		# memoized exports, with the revision they were built at
+		self._appearances: Dict[Tuple[str, str], Dict[str, str]] = {}
+		self._unindexed: List[str] = []
+		# IDs of restored or edited elements not yet (again) in
+		# `spatial_indices`
+		self._region_slots: Dict[str, Tuple[str, Dict[str, int]]] = {}
+		# element ID -> (texture name, marker name -> slot in its index)
+		if storage == "object":
+			self._store: Optional["ColumnarStore"] = None
+			self.elements: Mapping[str, Element] = {}
+			self.ungrouped_elements: Mapping[str, Element] = {}
+		elif storage == "columnar":
+			from .columnar import ColumnarStore
+			# imported here, for `columnar` depends on this module
+			self._store = ColumnarStore(self)
+			self.elements = self._store
+			self.ungrouped_elements = self._store.ungrouped()
+		else:
+			raise ValueError("Unsupported value for `storage`.")
 		self.add_texture(main_texture, "")
 		# the key of main texture is an empty string
 		self.z_index_start = {"point": 300, "patch": 100}
@@ -738,10 +1210,41 @@ class GuiAnnotation:
 			self.z_index_start.update(z_index_start)
 		# in this setting, when the number of patches is less than 200,
 		# all the patches will be displayed below the points
+		self.ordinal_style = str(ordinal_style)
 		self.ordinals: Generator[str, None, None] = ordinals(ordinal_style)
+		# the series is loaded here, so that an unknown style fails early
 		self.color_series = [str(cs) for cs in color_series]
 		CurrentContext().focus_on(self)
 
+	@classmethod
+	def restore(cls, textures: Dict[str, Texture],
+		groups: Dict[str, List[str]], ids: List[str],
+		raw: Callable[[int], Dict[str, Dumpable]], **kwargs: Any) -> Self:
+		'''Rebuild an annotation from exported data. Used by loaders.
+		# # #
+		`textures`: validated (or trusted) textures, the main one keyed "".
+		`ids`: element IDs, in the order that they were annotated.
+		`raw`: a function giving the raw object (as `Element.to_object`
+			returns) of the i-th element. Elements are only created when
+			accessed, see `LazyElements`.
+		`kwargs`: passed to `__init__`, except `storage`.
+		'''
+		if kwargs.get("storage", "object") != "object":
+			raise ValueError("Restored annotations use the object storage.")
+		hold = cls(textures[""], **kwargs)
+		for tn, tins in textures.items():
+			if tn:
+				hold.add_texture(tins, tn)
+		hold.groups = {gn: list(gels) for gn, gels in groups.items()}
+		grouped = {el_id for gels in groups.values() for el_id in gels}
+		hold.elements = LazyElements(ids, raw, hold)
+		hold.ungrouped_elements = hold.elements.subset(
+			el_id for el_id in ids if el_id not in grouped)
+		hold.element_order = [(el_id,) for el_id in ids]
+		hold._unindexed = list(ids)
+		hold.touch()
+		return hold
+
 	def __getitem__(self, key: str) -> Union[Element, List[Element]]:
 		'''Get an element or a group of elements with element ID or
 			group ID (starting with "#").
@@ -760,8 +1263,9 @@ class GuiAnnotation:
 	def _(self, texture: str, name: str) -> Self:
 		if (name := str(name)) in self.textures:
 			raise ValueError(f"There is already a textured named {name}.")
-		self.textures[str(name)] = (Texture(texture).bind_shortcut(name)
-			.validate_path())
+		self.textures[name] = TextureRegistry().bind(texture, name)
+		# shared with other annotations using the same file
+		self.touch()
 		return self
 
 	@add_texture.register
@@ -770,6 +1274,42 @@ class GuiAnnotation:
 			raise ValueError(f"There is already a textured named {name}.")
 		self.textures[str(name)] = (texture.bind_shortcut(name)
 			.validate_path())
+		self.touch()
+		return self
+
+	def add_textures(self, textures: Mapping[str, Union[str, Texture]],
+		workers: Optional[int] = None) -> Self:
+		'''Add textures by their names. They are validated and measured
+			concurrently (see `prefetch_textures`), and nothing is added if
+			any of them is bad; all the bad ones are reported at once.
+		'''
+		named = {str(name): tex for name, tex in textures.items()}
+		if (clash := self.textures.keys() & named.keys()):
+			raise ValueError(f"There are already textures named "
+				f"{sorted(clash)}.")
+		for tex in named.values():
+			if not isinstance(tex, (str, Texture)):
+				raise TypeError("Only `Texture` and `str` instances are "
+					"accepted.")
+		fresh = {tex: Texture(tex) for tex in named.values()
+			if isinstance(tex, str)}
+		prefetch_textures([*fresh.values(), *(tex for tex in named.values()
+			if isinstance(tex, Texture))], workers)
+		registry = TextureRegistry()
+		for name, tex in named.items():
+			self.textures[name] = (registry.bind(tex, name,
+				registry.adopt(fresh[tex])) if isinstance(tex, str)
+				else tex.bind_shortcut(name))
+			# shared with other annotations using the same file, as by
+			# `add_texture`
+		self.touch()
+		return self
+
+	def prefetch_textures(self, workers: Optional[int] = None) -> Self:
+		'''Validate and measure all the textures concurrently, e.g. after
+			`load`, where paths are trusted and sizes are read lazily.
+		'''
+		prefetch_textures(self.textures.values(), workers)
 		return self
 
 	@singledispatchmethod
@@ -782,14 +1322,170 @@ class GuiAnnotation:
 		el_id = element.id
 		if el_id in self.elements:
 			raise ValueError(f"There is already an element with id {el_id}.")
-		self.elements[el_id] = element
+		if self._store is not None:
+			self._store.append(element, self._current_group)
+		else:
+			self.elements[el_id] = element
+			if self._current_group is None:
+				self.ungrouped_elements[el_id] = element
 		self.element_order.append((el_id,))
 		if self._current_group is not None:
 			self.groups[self._current_group].append(el_id)
+		self._index_regions(element)
+		self.touch()
+		return self
+
+	@annotate.register(iterable)
+	def _(self, elements: Iterable[Element]) -> Self:
+		return self.annotate_many(elements)
+
+	def annotate_many(self, elements: Iterable[Element]) -> Self:
+		'''Annotate a batch of elements in one pass. The ID checks and the
+			duplicate detection run once over the whole batch, and nothing
+			is annotated if any of them fails.
+		'''
+		batch = list(elements)
+		for el in batch:
+			if not isinstance(el, Element):
+				raise TypeError("Unsupported element class {}".format(
+					el.__class__))
+		ids = validated_ids(el.id for el in batch)
+		if (clash := self.elements.keys() & set(ids)):
+			raise ValueError("There are already elements with ids "
+				f"{sorted(clash)}.")
+		if self._store is not None:
+			for el in batch:
+				self._store.append(el, self._current_group)
 		else:
-			self.ungrouped_elements[el_id] = element
+			self.elements.update(zip(ids, batch))
+			if self._current_group is None:
+				self.ungrouped_elements.update(zip(ids, batch))
+		self.element_order.extend((el_id,) for el_id in ids)
+		if self._current_group is not None:
+			self.groups[self._current_group].extend(ids)
+		for el in batch:
+			self._index_regions(el)
+		self.touch()
 		return self
 
+	def _index_regions(self, element: Element) -> None:
+		'''Add the regions of an element to the spatial index of its
+			texture, or move them there if already indexed.
+		'''
+		tn = element.get_texture_name()
+		regions = element.get_regions() if tn is not None else {}
+		if (old := self._region_slots.pop(element.id, None)) is not None:
+			old_tn, slots = old
+			if old_tn == tn and slots.keys() == regions.keys():
+				index = self.spatial_indices[tn]
+				for pt_name, region in regions.items():
+					index.update(slots[pt_name], region)
+				self._region_slots[element.id] = old
+				return
+			for slot in slots.values():
+				self.spatial_indices[old_tn].remove(slot)
+		if tn is None:
+			return
+		if (index := self.spatial_indices.get(tn)) is None:
+			index = self.spatial_indices[tn] = GridIndex()
+		self._region_slots[element.id] = (tn, {pt_name:
+			index.insert(region, (element.id, pt_name))
+			for pt_name, region in regions.items()})
+
+	def _registered(self, element: Element) -> bool:
+		'''Whether `element` is the one annotated under its ID. Elements
+			not restored yet are not created to tell.
+		'''
+		if self._store is not None:
+			return getattr(element, "_store", None) is self._store
+			# only views are stored
+		if isinstance(self.elements, LazyElements):
+			return self.elements.peek(element.id) is element
+		return self.elements.get(element.id) is element
+
+	def _regions_changed(self, el_id: str) -> None:
+		'''Called when the markers of an element change, so that its
+			regions are indexed again before the next query.
+		'''
+		if el_id in self._region_slots:
+			self._unindexed.append(el_id)
+			# elements never indexed are either pending or not annotated
+
+	def _ensure_indexed(self) -> None:
+		'''Index the regions of restored elements, which materializes them,
+			and those of edited elements again.
+		'''
+		pending, self._unindexed = self._unindexed, []
+		for el_id in dict.fromkeys(pending):
+			self._index_regions(self.elements[el_id])
+
+	def find_overlaps(self) -> List[Tuple[str, Tuple[str, str],
+		Tuple[str, str]]]:
+		'''Find every pair of intersecting patches of different elements,
+			texture by texture, with a sweep line (see
+			`spatial.find_intersections`). Overlaps whitelisted by either
+			element (see `Element.allow_overlap`) are excluded.
+		# # #
+		`return`: a list of (texture name, (element ID, marker name),
+			(element ID, marker name)).
+		'''
+		self._ensure_indexed()
+		built: List[Tuple[str, Tuple[str, str], Tuple[str, str]]] = []
+		whitelists: Dict[str, FrozenSet[str]] = {}
+		group_of: Optional[Dict[str, Set[str]]] = None
+
+		def allowed(a: str, b: str) -> bool:
+			nonlocal group_of
+			for this, other in ((a, b), (b, a)):
+				if this not in whitelists:
+					whitelists[this] = self.elements[this].overlap_whitelist
+				if not whitelists[this]:
+					continue
+				if other in whitelists[this]:
+					return True
+				if group_of is None:
+					group_of = {}
+					for gn, gels in self.groups.items():
+						for el_id in gels:
+							group_of.setdefault(el_id, set()).add("#" + gn)
+				if whitelists[this] & group_of.get(other, set()):
+					return True
+			return False
+
+		for tn, index in self.spatial_indices.items():
+			for i, j in find_intersections(index.regions):
+				a, b = index.payloads[i], index.payloads[j]
+				if a[0] == b[0] or allowed(a[0], b[0]):
+					continue
+				built.append((tn, a, b))
+		return built
+
+	def query_point(self, x: int, y: int,
+		texture: str = "") -> List[Element]:
+		'''Find the elements whose patches cover the pixel (x, y) of the
+			texture named `texture` (the main texture by default).
+		'''
+		self._ensure_indexed()
+		if (index := self.spatial_indices.get(texture)) is None:
+			return []
+		found = dict.fromkeys(el_id for el_id, _ in index.query_point(x, y))
+		return [self.elements[el_id] for el_id in found]
+
+	def query_rect(self, ul: Tuple[int, int], size: Tuple[int, int],
+		texture: str = "", contained: bool = False) -> List[Element]:
+		'''Find the elements whose patches intersect the given rectangle
+			of the texture named `texture` (the main texture by default).
+		# # #
+		`contained`: only find the patches entirely inside the rectangle.
+		'''
+		self._ensure_indexed()
+		if (index := self.spatial_indices.get(texture)) is None:
+			return []
+		(x, y), (w, h) = ul, size
+		found = dict.fromkeys(el_id for el_id, _ in
+			index.query_rect((x, y, x + w, y + h), contained))
+		return [self.elements[el_id] for el_id in found]
+
 	def switch_group(self, group_id: Optional[str]) -> Self:
 		'''Switch the current group to `group_id`. If `group_id` is None,
 			then clear the current group.
@@ -800,12 +1496,16 @@ class GuiAnnotation:
 			group_id = validated_id(group_id)
 			if group_id not in self.groups:
 				self.groups[group_id] = []
+				self.touch()
 			self._current_group = group_id
 		return self
 
 	def __matmul__(self, rhs) -> Self:
-		'''(@) A shorthand of `add_texture`.
+		'''(@) A shorthand of `add_texture`, or `add_textures` if `rhs` is a
+			mapping.
 		'''
+		if isinstance(rhs, mapping):
+			return self.add_textures(rhs)
 		return self.add_texture(*rhs)
 
 	def __add__(self, rhs) -> Self:
@@ -814,40 +1514,88 @@ class GuiAnnotation:
 		return self.switch_group(rhs)
 
 	def __sub__(self, rhs) -> Self:
-		'''(-) A shorthand of `annotate`.
+		'''(-) A shorthand of `annotate`. `rhs` can also be an iterable of
+			elements, as `annotate_many`.
 		'''
 		return self.annotate(rhs)
 
+	def element_objects(self) -> List[Dict[str, Dumpable]]:
+		'''`Element.to_object` of all the elements, in the order that they
+			are annotated.
+		'''
+		if self._store is not None:
+			return self._store.to_objects()
+		return list(self._iter_element_objects())
+
+	def element_Java_likes(self) -> List[Tuple[str, str]]:
+		'''`Element.to_Java_like` of all the elements, in the order that
+			they are annotated.
+		'''
+		if self._store is not None:
+			return self._store.to_Java_like()
+		return [el.to_Java_like() for el in self.elements.values()]
+
+	def touch(self) -> None:
+		'''Mark the annotation changed, i.e. drop its memoized exports
+			(those of the elements are kept unless they are invalidated).
+		'''
+		self._revision += 1
+
+	def _memoized(self, key: Hashable, build: Callable[[], Any]) -> Any:
+		'''Return the result of `build` memoized under `key`, rebuilding it
+			if anything has changed since.
+		'''
+		if (found := self._exports.get(key)) is not None \
+			and found[0] == self._revision:
+			return found[1]
+		built = build()
+		self._exports[key] = (self._revision, built)
+		return built
+
+	def _element_indices(self) -> Dict[str, int]:
+		'''Element IDs -> the order that the elements were annotated in.
+		'''
+		return self._memoized(("indices",), lambda: {el_key[0]: i
+			for i, el_key in enumerate(self.element_order)})
+
+	def _appearance(self, el_id: str, coloring: str,
+		series: Iterator[str]) -> Dict[str, str]:
+		'''The color and the symbol of an element on the webpage. The color
+			is drawn from `series` the first time, and kept since, so that
+			the HTML of unchanged elements can be reused. The symbol is the
+			ordinal of the element index (see `ordinal`), the same however
+			the annotation is exported.
+		'''
+		if (found := self._appearances.get((coloring, el_id))) is None:
+			found = self._appearances[(coloring, el_id)] = {
+				"color": next(series), "symbol": ordinal(self.ordinal_style,
+					self._element_indices()[el_id])}
+		return found
+
+	def _serialized(self) -> Dict[str, Union[Dumpable, dict]]:
+		built: [str, Union[Dumpable, dict]] = {}
+		built["textures"] = {tn: tins.get_preferred_path()
+			for tn, tins in self.textures.items()}
+		built["groups"] = {gn: list(gels) for gn, gels in self.groups.items()}
+		built["elements"] = self.element_objects()
+		return built
+
 	def serialize(self,
 		file_path: Optional[str] = None) -> Dict[str, Union[Dumpable, dict]]:
 		'''Convert GUI annotations to a JSON object (as Python dictionary)
 			with essential information. This does not use `ObjectProvider`
 			as the homonymous method of `Element`.
 		'''
-		built: [str, Union[Dumpable, dict]] = {}
-		built["textures"] = {tn: tins.get_preferred_path()
-			for tn, tins in self.textures.items()}
-		built["groups"] = {gn: list(gels) for gn, gels in self.groups.items()}
-		built["elements"] = [el.to_object() for el in self.elements.values()]
+		built = copied(self._memoized(("serialize",), self._serialized))
 		if file_path:
-			with open(recognize_resource_location(file_path,
-				ext=".json"), "w") as file:
+			with atomic_open(recognize_resource_location(file_path,
+				ext=".json"), "w", encoding="utf-8") as file:
 				json.dump(built, file, ensure_ascii=False, indent="\t")
 		# will return regardless of whether `file_path` is None
 		return built
 
-	def to_Java_fragment(self, file_path: Optional[str] = None,
+	def _Java_fragment(self,
 		order: Literal["class", "elementorder"] = "class") -> str:
-		'''Record essential information of annotations as Java code lines.
-			Note that this method does not produce runnable Java code,
-			the lines should be pasted manually to where they should be.
-		Not all the information will be recorded - some will be lost, such
-			as the grouping and clipping directions of clippable elements.
-		# # #
-		`order`: in what order should the statements be arranged.
-			"class": statements of the same class are put together.
-			"elementorder": by the order that elements are annotated.
-		'''
 		built: List[str] = []
 		built.append("// This is a fragment. "
 			"Paste this to where it should be.")
@@ -864,8 +1612,7 @@ class GuiAnnotation:
 				"Point": [], "Rect": [], "UV": [], "TexturedUV": [],
 				"AtlasUV": []
 			} # temporary storage
-			for el in self.elements.values():
-				cls_name, stat = el.to_Java_like()
+			for cls_name, stat in self.element_Java_likes():
 				if len(stat) > 79:
 					break_p = stat.find("(") + 1
 					if break_p > 1:
@@ -881,39 +1628,132 @@ class GuiAnnotation:
 				built += lines
 		elif order == "elementorder":
 			# arrange the elements by the order that they were annotated
-			for el in self.elements.values():
-				cls_name, stat = el.to_Java_like()
+			for cls_name, stat in self.element_Java_likes():
 				if len(stat) > 79:
 					break_p = stat.find("(") + 1
 					if break_p > 1:
 						stat = stat[:break_p] + "\n\t" + stat[break_p:]
 				built.append(stat)
-		built_text = "\n".join(built)
+		return "\n".join(built)
+
+	def iter_serialized(self,
+		compact: bool = True) -> Generator[str, None, None]:
+		'''Yield the JSON text of `serialize` piece by piece: textures and
+			groups first, then elements one by one, so that the whole
+			document is never held in memory.
+		# # #
+		`compact`: use the C-accelerated encoder without whitespaces.
+			Otherwise the text is identical to the file written by
+			`serialize`, but the pure-Python indenting encoder is used.
+		'''
+		if compact:
+			encode = json.JSONEncoder(ensure_ascii=False,
+				separators=(",", ":")).encode
+			yield '{"textures":' + encode({tn: tins.get_preferred_path()
+				for tn, tins in self.textures.items()})
+			yield ',"groups":' + encode(self.groups)
+			yield ',"elements":['
+			for el_i, obj in enumerate(self._iter_element_objects()):
+				yield ("," if el_i else "") + encode(obj)
+			yield "]}"
+			return
+		pretty = json.JSONEncoder(ensure_ascii=False, indent="\t").encode
+		nested = lambda obj, level: pretty(obj).replace("\n",
+			"\n" + "\t" * level)
+		# JSON strings never contain raw line breaks
+		yield '{\n\t"textures": ' + nested({tn: tins.get_preferred_path()
+			for tn, tins in self.textures.items()}, 1)
+		yield ',\n\t"groups": ' + nested(self.groups, 1)
+		yield ',\n\t"elements": ['
+		el_i = -1
+		for el_i, obj in enumerate(self._iter_element_objects()):
+			yield ("," if el_i else "") + "\n\t\t" + nested(obj, 2)
+		yield ("\n\t]" if el_i >= 0 else "]") + "\n}"
+
+	def _iter_element_objects(self) -> Iterator[Dict[str, Dumpable]]:
+		if self._store is not None:
+			return iter(self._store.to_objects())
+		if isinstance(self.elements, LazyElements):
+			return self.elements.iter_objects()
+		return (el.to_object() for el in self.elements.values())
+
+	def stream_serialize(self, file: Union[str, IO[str]],
+		compact: bool = True) -> None:
+		'''Write the JSON text of `serialize` incrementally to `file`, a path
+			(resource locations accepted) or a text file handle. See
+			`iter_serialized`.
+		'''
+		if isinstance(file, str):
+			with atomic_open(recognize_resource_location(file, ext=".json"), "w",
+				encoding="utf-8") as handle:
+				handle.writelines(self.iter_serialized(compact))
+		else:
+			file.writelines(self.iter_serialized(compact))
+
+	def to_binary(self, file_path: str) -> None:
+		'''Write the annotation as a compact binary archive (".mgct"),
+			which `load_binary` maps into memory and reads lazily.
+		'''
+		from .archive import write_archive
+		# # #
+		write_archive(self, file_path)
+
+	@classmethod
+	def load_binary(cls, file_path: str, lazy: bool = True,
+		**kwargs: Any) -> Self:
+		'''Load an archive written by `to_binary`. Elements are only
+			unpacked when accessed, unless not `lazy` (see `load_archive`).
+		'''
+		from .archive import load_archive
+		# # #
+		return load_archive(file_path, lazy, **kwargs)
+
+	@classmethod
+	def load(cls, file_path: str, **kwargs: Any) -> Self:
+		'''Rebuild an annotation from the JSON written by `serialize`.
+			Textures are trusted as they were validated before serialized,
+			and element objects are kept raw until accessed.
+		# # #
+		`kwargs`: passed to `__init__`.
+		'''
+		with open(recognize_resource_location(file_path, ext=".json"),
+			encoding="utf-8") as file:
+			loaded = json.load(file)
+		textures = {tn: Texture(tp).validate_path(trusted=True)
+			for tn, tp in loaded["textures"].items()}
+		objects: List[Dict[str, Dumpable]] = loaded["elements"]
+		return cls.restore(textures, loaded["groups"],
+			[obj["name"] for obj in objects], objects.__getitem__, **kwargs)
+
+	def to_Java_fragment(self, file_path: Optional[str] = None,
+		order: Literal["class", "elementorder"] = "class") -> str:
+		'''Record essential information of annotations as Java code lines.
+			Note that this method does not produce runnable Java code,
+			the lines should be pasted manually to where they should be.
+		Not all the information will be recorded - some will be lost, such
+			as the grouping and clipping directions of clippable elements.
+		# # #
+		`order`: in what order should the statements be arranged.
+			"class": statements of the same class are put together.
+			"elementorder": by the order that elements are annotated.
+		'''
+		built_text = self._memoized(("Java", order),
+			lambda: self._Java_fragment(order))
 		if file_path:
-			with open(recognize_resource_location(file_path,
-				ext=".java"), "w") as file:
+			with atomic_open(recognize_resource_location(file_path,
+				ext=".java"), "w", encoding="utf-8") as file:
 				file.write(built_text)
 		# will return regardless of whether `file_path` is None
 		return built_text
 
-	def to_HTML_fragment(self, file_path: Optional[str] = None,
+	def _HTML_fragment(self,
 		coloring: Literal["groupwise", "order"] = "groupwise",
-		indent: int = 0) -> str:
-		'''Convert GUI annotations to HTML elements.
-		The information is nearly all preserved, but not guaranteed.
-		# # #
-		`coloring`: how the elements are colored.
-			`groupwise`: elements within one group will be colored similarly.
-			`order`: elements will be colored according to their order,
-				regardless of groups.
-		`indent`: the number of tabs preceding each line.
-		# # #
-		If an element belongs to `group_name`, then it will have the class
-			"g--`group_name`".
-		Texture named `tex_name` will have the class "tex--`tex_name`".
-		'''
-		built: Dict[str, List[str]] = {tn: [] for tn in self.textures}
-		# every texture has a list
+		indent: int = 0,
+		texture_loading: Literal["eager", "lazy", "files"] = "eager"
+	) -> Tuple[List[Union[str, Texture]], Dict[str, Union[str, Texture]]]:
+		built: Dict[str, List[List[Dumpable]]] = {tn: []
+			for tn in self.textures}
+		# every texture has a list of marker rows
 		texture_el_counts: Dict[str, int] = {}
 		if coloring == "groupwise":
 			el_i = -1
@@ -932,12 +1772,12 @@ class GuiAnnotation:
 						continue
 					texture_el_counts[etx] = el_i = \
 						texture_el_counts.get(etx, 0) + 1
-					built[etx].append("\n".join(el.to_HTML(
-						color=next(group_color_series),
-						symbol=next(self.ordinals),
+					built[etx] += el.to_HTML_rows(
+						**self._appearance(el_name, coloring,
+							group_color_series),
 						z_index=self.ΔZ * el_i,
 						additional_classes=["g--" + gn]
-					)))
+					)
 			group_color_series = color_series("dim")
 			for el in self.ungrouped_elements.values():
 				# then ungrouped ones
@@ -950,20 +1790,19 @@ class GuiAnnotation:
 					continue
 				texture_el_counts[etx] = el_i = \
 					texture_el_counts.get(etx, 0) + 1
-				built[etx].append("\n".join(el.to_HTML(
-					color=next(group_color_series),
-					symbol=next(self.ordinals),
+				built[etx] += el.to_HTML_rows(
+					**self._appearance(el.id, coloring, group_color_series),
 					z_index=self.ΔZ * el_i,
 					additional_classes=[]
-				)))
+				)
 		elif coloring == "order":
 			group_color_series = color_series("any")
 			for eln, el in self.elements.items():
 				groups_containing: List[str] = []
-				for gn, gels in self.groups:
+				for gn, gels in self.groups.items():
 					# find all groups that contain this element
 					if eln in gels:
-						groups_containing.append("g--" + eln)
+						groups_containing.append("g--" + gn)
 				if isinstance(el, Textured):
 					etx = el.texture.bound_shortcut
 				else:
@@ -973,126 +1812,195 @@ class GuiAnnotation:
 					continue
 				texture_el_counts[etx] = el_i = \
 					texture_el_counts.get(etx, 0) + 1
-				built[etx].append("\n".join(el.to_HTML(
-					color=next(group_color_series),
-					symbol=next(self.ordinals),
+				built[etx] += el.to_HTML_rows(
+					**self._appearance(eln, coloring, group_color_series),
 					z_index=self.ΔZ * el_i,
 					additional_classes=groups_containing
-				)))
+				)
 		else:
 			raise ValueError("Unsupported value for `coloring`.")
 		# # #
-		all_built_texts: List[str] = []
-		all_built_texts.append(
+		all_built: List[Union[str, Texture]] = []
+		# texts, and textures where their data URLs go
+		all_built.append(
 			"<script>var allGroupData = {}</script>".format(repr(self.groups)
 				.replace("(", "[").replace(")", "]").replace("'", '"'))
 		) # add a group list
-		for tn, segs in built.items():
+		all_built.append("\n\n<style>\n{}\n</style>".format("\n".join(
+			f"#display.hide--{gn} .g--{gn} {{visibility: hidden;}}"
+			for gn in self.groups)))
+		# a group is hidden by adding the class "hide--`group_name`" to the
+		# display container, see `setGroupVisible` in interaction.js
+		side_files: Dict[str, Union[str, Texture]] = {}
+		# files referred to by the fragment: relative path -> text, or a
+		# texture to copy
+		for tex_i, (tn, segs) in enumerate(built.items()):
+			tins = self.textures[tn]
 			texture_built_text = ("<div class=\"tex--{} texwrap\" "
 				"data='{{\"w\":{},\"h\":{},\"path\":\"{}\"}}'>\n").format(
-					tn, *self.textures[tn].size,
-					self.textures[tn].get_preferred_path())
-			texture_built_text += "<img src=\"{}\">".format(
-				to_data_URL(self.textures[tn].texture_path)
-			)
-			texture_built_text += "\n\n"
-			texture_built_text += "\n\n".join(segs)
+					tn, *tins.size, tins.get_preferred_path())
+			payload = script_JSON({"markers": segs})
+			if texture_loading == "files":
+				# both fetched by the page scripts when first shown
+				tex_file = "textures/{}.png".format(
+					TextureMetadataCache().digest_of(tins.texture_path)[:16])
+				marker_text = f"registerMarkers({tex_i}, {payload})\n"
+				marker_file = "textures/{}.js".format(
+					hashlib.sha256(marker_text.encode()).hexdigest()[:16])
+				side_files[tex_file] = tins
+				side_files[marker_file] = marker_text
+				texture_built_text += f"<img data-src=\"{tex_file}\">"
+				texture_built_text += ("\n<script type=\"text/plain\" "
+					f"class=\"markerfile\" data-src=\"{marker_file}\">"
+					"</script>")
+			else:
+				if texture_loading == "lazy" and tex_i > 0:
+					texture_built_text += ("<img>\n<script type=\"text/plain\" "
+						"class=\"lazysrc\">\0</script>")
+					# decoded by the page scripts when first shown
+				elif texture_loading in ("eager", "lazy"):
+					texture_built_text += "<img src=\"\0\">"
+				else:
+					raise ValueError("Unsupported value for "
+						"`texture_loading`.")
+				# the data URL is filled in when written
+				texture_built_text += ("\n<script type=\"application/json\" "
+					"class=\"markerdata\">{}</script>").format(payload)
+				# the page scripts create the elements from these rows
 			texture_built_text += "\n</div>"
-			all_built_texts.append("\n".join("\t" * indent + ln
+			indented = "\n".join("\t" * indent + ln
 				if ln.strip() else ln
 				for ln in texture_built_text.splitlines())
-			)
+			if "\0" in indented:
+				head, tail = indented.split("\0")
+				all_built += ["\n\n" + head, tins, tail]
+			else:
+				all_built.append("\n\n" + indented)
+		# # #
+		return all_built, side_files
+
+	def iter_HTML_fragment(self,
+		coloring: Literal["groupwise", "order"] = "groupwise",
+		indent: int = 0,
+		texture_loading: Literal["eager", "lazy", "files"] = "eager"
+	) -> Iterator[Union[str, Texture]]:
+		'''Yield the text of `to_HTML_fragment` piece by piece, with
+			`Texture` instances in place of their data URLs.
+		# # #
+		`texture_loading`: when the page loads the textures other than the
+			main one, and their markers.
+			"eager": all on opening, embedded.
+			"lazy": embedded, but decoded when first shown.
+			"files": fetched from files when first shown, see
+				`write_HTML_side_files`. Also for the main texture.
+		'''
+		yield from self._memoized(("HTML", coloring, indent, texture_loading),
+			lambda: self._HTML_fragment(coloring, indent, texture_loading))[0]
+
+	def write_HTML_side_files(self, folder: str,
+		coloring: Literal["groupwise", "order"] = "groupwise",
+		indent: int = 0,
+		texture_loading: Literal["eager", "lazy", "files"] = "eager"
+	) -> List[str]:
+		'''Write the files that the fragment refers to (only with
+			`texture_loading="files"`) into `folder`, where the page is.
+			Files are named by content hashes, so existing ones are kept.
+			Return their relative paths.
+		'''
+		side_files = self._memoized(("HTML", coloring, indent,
+			texture_loading), lambda: self._HTML_fragment(coloring, indent,
+				texture_loading))[1]
+		for rel_path, content in side_files.items():
+			target = os.path.join(folder, rel_path)
+			if os.path.isfile(target):
+				continue
+			if isinstance(content, str):
+				with atomic_open(target, "w", encoding="utf-8") as file:
+					file.write(content)
+			else:
+				with atomic_open(target, "wb") as file:
+					file.write(embedded_bytes(content.texture_path))
+		return list(side_files)
+
+	def stream_HTML_fragment(self, file: Union[str, IO[str]],
+		coloring: Literal["groupwise", "order"] = "groupwise",
+		indent: int = 0,
+		texture_loading: Literal["eager", "lazy", "files"] = "eager"
+	) -> None:
+		'''Write the text of `to_HTML_fragment` to `file`, a path (resource
+			locations accepted) or a text file handle. Textures are encoded
+			chunk by chunk into the file, see `write_data_URL`.
+		`texture_loading`: see `iter_HTML_fragment`.
+		'''
+		if isinstance(file, str):
+			with atomic_open(recognize_resource_location(file,
+				ext=".html"), "w", encoding="utf-8") as handle:
+				self.stream_HTML_fragment(handle, coloring, indent,
+					texture_loading)
+			return
+		for seg in self.iter_HTML_fragment(coloring, indent,
+			texture_loading):
+			if isinstance(seg, str):
+				file.write(seg)
+			else:
+				write_data_URL(file, seg.texture_path)
+
+	def to_HTML_fragment(self, file_path: Optional[str] = None,
+		coloring: Literal["groupwise", "order"] = "groupwise",
+		indent: int = 0) -> str:
+		'''Convert GUI annotations to HTML elements.
+		The information is nearly all preserved, but not guaranteed.
+		# # #
+		`coloring`: how the elements are colored.
+			`groupwise`: elements within one group will be colored similarly.
+			`order`: elements will be colored according to their order,
+				regardless of groups.
+		`indent`: the number of tabs preceding each line.
 		# # #
-		built_text = "\n\n".join(all_built_texts)
+		Markers are not written as HTML elements, but as rows (see
+			`Marker.to_HTML_row`) in one JSON payload per texture, from which
+			the page scripts create the elements.
+		If an element belongs to `group_name`, then it will have the class
+			"g--`group_name`", and is hidden by a generated CSS rule when
+			the display container has the class "hide--`group_name`".
+		Texture named `tex_name` will have the class "tex--`tex_name`".
+		'''
+		built_text = "".join(seg if isinstance(seg, str) else seg.data_URL
+			for seg in self.iter_HTML_fragment(coloring, indent))
 		if file_path:
-			with open(recognize_resource_location(file_path,
-				ext=".html"), "w") as file:
+			with atomic_open(recognize_resource_location(file_path,
+				ext=".html"), "w", encoding="utf-8") as file:
 				file.write(built_text)
 		# will return regardless of whether `file_path` is None
 		return built_text
 
 	def assemble_webpage(self, file_path: Optional[str] = None,
-		embed: bool = True, lang: str = "zh_cn") -> None:
+		embed: bool = True, lang: str = "zh_cn",
+		renderer: Literal["dom", "canvas"] = "dom",
+		texture_loading: Literal["eager", "lazy", "files"] = "eager"
+	) -> None:
 		'''Assemble a webpage that visualizes the annotation.
 		# # #
 		`embed`: whether style sheets and scripts are embedded into one
 			HTML file.
 		`lang`: language in the document.
+		`renderer`: "dom" creates an element for every marker; "canvas"
+			draws them on one canvas per texture, better for thousands of
+			markers.
+		`texture_loading`: see `iter_HTML_fragment`. With "files", the
+			textures and markers are written into "textures/" beside the
+			page.
 		'''
-		HERE = os.path.dirname(__file__)
-		if not os.path.exists(lang_dir := HERE + f"/blocks/lang/{lang}.json"):
-			# look for the language file
-			raise ValueError(f"Language file `{lang}.json` does not exist.")
-		with open(lang_dir, "r", encoding="utf-8") as lang_file:
-			lang_dict = json.load(lang_file)
-		with open(HERE + "/blocks/frame.html",
-			"r", encoding="utf-8") as frame_file:
-			frame = frame_file.read()
-		# these slots should be defined in the HTML frame:
-		# $stylesheet$, $langdict$, $scripts$, $iconsrc$, $elements$
-		frame = frame.replace("$langdict$",
-			'<script type="text/javascript">\n\t\t'
-			'langEntries = {{\n\t\t\t'
-			'{}\n\t\t'
-			'}}\n\t</script>'.format(
-				"\n\t\t\t".join(
-					'"{}": "{}",'.format(k, v)
-					for k, v in lang_dict.items()
-				)
-			)
-		) # $langdict$ is filled by the same way regardless of `embed`
+		template = PageTemplate.of(lang, embed, renderer)
+		# compiled once, see `PageTemplate`
+		out_file_name = recognize_resource_location(file_path, ext=".html")
 		if not embed:
-			frame = frame.replace("$stylesheet$",
-				'<link rel="stylesheet" type="text/css" '
-				'href="./sources/magcotstyle.css">'
-			)
-			frame = frame.replace("$scripts$",
-				'<script type="text/javascript" '
-				'src="./sources/arrangement.js"></script>\n\t'
-				'<script type="text/javascript" '
-				'src="./sources/interaction.js"></script>'
-			)
-			frame = frame.replace("$iconsrc$", "./sources/icon.png")
-			frame = frame.replace("$elements$",
-				self.to_HTML_fragment(indent = 4))
-			out_file_name = recognize_resource_location(file_path,
-				ext=".html")
-			destination = os.path.split(out_file_name)[0]
-			# destination to copy the resource files
-			copytree(HERE + "/blocks/sources", destination + "/sources",
-				dirs_exist_ok=True)
-			with open(out_file_name, "w", encoding="utf-8") as file:
-				file.write(frame)
-		else:
-			# embed all the files
-			SOURCE_BASE = HERE + "/blocks/sources/"
-			with open(SOURCE_BASE + "magcotstyle.css", "r",
-				encoding="utf-8") as file:
-				read_text = file.read()
-			frame = frame.replace("$stylesheet$",
-				'<style type="text/css">\n'
-				+ "\n".join(
-					"\t\t" + ln for ln in read_text.splitlines()
-				)
-				+ '\n\t</style>'
-			)
-			JSs = ["arrangement", "interaction"]
-			# JavaScript file names used
-			JS_texts: List[str] = []
-			for js in JSs:
-				with open(SOURCE_BASE + js + ".js", "r",
-				encoding="utf-8") as file:
-					read_text = file.read()
-					JS_texts.append('<script type="text/javascript">\n'
-						+ "\n".join(
-						"\t\t" + ln for ln in read_text.splitlines())
-						+ '\n\t</script>'
-					)
-			frame = frame.replace("$scripts$", "\n\t".join(JS_texts))
-			frame = frame.replace("$iconsrc$",
-				to_data_URL(SOURCE_BASE + "icon.png"))
-			frame = frame.replace("$elements$",
-				self.to_HTML_fragment(indent = 4))
-			with open(recognize_resource_location(file_path,
-				ext=".html"), "w", encoding="utf-8") as file:
-				file.write(frame)
\ No newline at end of file
+			copy_sources(os.path.split(out_file_name)[0] + "/sources")
+			# copy the resource files beside the page
+		if texture_loading == "files":
+			self.write_HTML_side_files(os.path.split(out_file_name)[0],
+				indent=4, texture_loading=texture_loading)
+		with atomic_open(out_file_name, "w", encoding="utf-8") as file:
+			template.render(file,
+				lambda handle: self.stream_HTML_fragment(handle, indent=4,
+					texture_loading=texture_loading))
\ No newline at end of file
@@ -0,0 +1,146 @@
+'''Here defines a lossless optimizer of PNG files to embed into pages:
+	ancillary metadata chunks (texts, EXIF, timestamps, editor data) are
+	dropped, image data chunks are merged, and optionally deflated again.
+'''
+
+import io
+import os
+import struct
+import zlib
+from typing import *
+# # #
+from .texcache import PNG_SIGNATURE, TextureMetadataCache, atomic_open, \
+	default_cache_path
+
+
+
+KEPT_ANCILLARY: FrozenSet[bytes] = frozenset({b"tRNS", b"gAMA", b"sRGB",
+	b"iCCP", b"cHRM"})
+# ancillary chunks that change the pixels shown, i.e. transparency and color
+# spaces; critical chunks are always kept
+CHUNK_HEAD = struct.Struct(">I4s")
+# data length, chunk type; followed by the data and a CRC-32
+CHUNK_CRC = struct.Struct(">I")
+
+
+
+def iter_chunks(content: bytes) -> Iterator[Tuple[bytes, bytes]]:
+	'''Yield the type and the data of each chunk in a PNG file, up to
+		"IEND". Raise ValueError if the file is not a well-formed PNG file.
+	'''
+	if content[:8] != PNG_SIGNATURE:
+		raise ValueError("Not a PNG file.")
+	pos = 8
+	while pos + CHUNK_HEAD.size <= len(content):
+		length, kind = CHUNK_HEAD.unpack_from(content, pos)
+		end = pos + CHUNK_HEAD.size + length
+		if end + CHUNK_CRC.size > len(content):
+			break
+		data = content[pos + CHUNK_HEAD.size:end]
+		if zlib.crc32(kind + data) != CHUNK_CRC.unpack_from(content, end)[0]:
+			raise ValueError(f"Bad CRC of chunk {kind!r} at {pos}.")
+		yield kind, data
+		if kind == b"IEND":
+			return
+		pos = end + CHUNK_CRC.size
+	raise ValueError("Truncated PNG file.")
+
+
+
+def pack_chunk(kind: bytes, data: bytes) -> bytes:
+	return (CHUNK_HEAD.pack(len(data), kind) + data
+		+ CHUNK_CRC.pack(zlib.crc32(kind + data)))
+
+
+
+def optimize_PNG(content: bytes, level: Optional[int] = None) -> bytes:
+	'''Return `content`, a PNG file, without ancillary chunks other than
+		those in `KEPT_ANCILLARY`, and with its "IDAT" chunks merged. The
+		pixels and the way they are shown are unchanged.
+	# # #
+	`level`: if given, the image data is also deflated again at this zlib
+		level (9 for the smallest), kept only if smaller. The scanline
+		filters are not chosen again.
+	'''
+	kept: List[bytes] = []
+	image_data: List[bytes] = []
+	for kind, data in iter_chunks(content):
+		if kind == b"IDAT":
+			if not image_data:
+				kept.append(b"")
+				# where the merged chunk goes, for "IDAT"s are consecutive
+			image_data.append(data)
+		elif not kind[0] & 0x20 or kind in KEPT_ANCILLARY:
+			# bit 5 of the first byte (lower case) marks ancillary chunks
+			kept.append(pack_chunk(kind, data))
+	stream = b"".join(image_data)
+	if level is not None:
+		deflated = zlib.compress(zlib.decompress(stream), level)
+		if len(deflated) < len(stream):
+			stream = deflated
+	return PNG_SIGNATURE + b"".join(chunk or pack_chunk(b"IDAT", stream)
+		for chunk in kept)
+
+
+
+class OptimizedPNGCache:
+	'''Results of `optimize_PNG`, stored on disk beside the texture
+		metadata cache (see `default_cache_path`) and named by the content
+		hash of the original file, so that each texture is only optimized
+		once across builds.
+	# # #
+	Singleton class.
+	'''
+
+	__instance: "Optional[Self]" = None
+	__slots__ = ("folder",)
+
+	def __new__(cls):
+		'''To make this singleton.
+		'''
+		if cls.__instance is None:
+			hold = super().__new__(cls)
+			metadata_path = default_cache_path()
+			hold.folder: str = (os.path.join(os.path.dirname(metadata_path),
+				"png") if metadata_path else "")
+			# empty if the caches are kept in memory only
+			cls.__instance = hold
+		return cls.__instance
+
+	def get(self, path: str, level: Optional[int] = None) -> bytes:
+		'''Return the optimized content of the PNG file at `path`. Files that
+			are not well-formed PNG files are returned as they are.
+		'''
+		with self.stream(path, level) as file:
+			return file.read()
+
+	def stream(self, path: str, level: Optional[int] = None) -> BinaryIO:
+		'''Open the optimized content of the PNG file at `path` for reading,
+			from the file cached on disk if any, so that it can be read in
+			chunks. See `get`.
+		'''
+		cached = os.path.join(self.folder, "{}-{}.png".format(
+			TextureMetadataCache().digest_of(path),
+			"n" if level is None else level))
+		if self.folder:
+			try:
+				return open(cached, "rb")
+			except OSError:
+				pass
+		return io.BytesIO(self._build(path, cached, level))
+
+	def _build(self, path: str, cached: str, level: Optional[int]) -> bytes:
+		with open(path, "rb") as file:
+			content = file.read()
+		try:
+			optimized = optimize_PNG(content, level)
+		except (ValueError, zlib.error):
+			return content
+		if self.folder:
+			try:
+				with atomic_open(cached, "wb") as file:
+					file.write(optimized)
+			except OSError:
+				# the cache is only an optimization
+				pass
+		return optimized
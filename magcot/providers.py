@@ -3,20 +3,29 @@
 '''
 
 import base64
-from collections import deque
+from collections import OrderedDict, deque
 from collections.abc import Iterable as iterable
 # collections.abc.Iterable can be used in type check, unlike typing.Iterable
 # they are both used
 from colorsys import hsv_to_rgb
+from concurrent.futures import ThreadPoolExecutor
 from functools import cached_property, singledispatchmethod
+from html import escape as html_escape
 from itertools import cycle
+import json
 from math import hypot
 from mimetypes import types_map as mime_types_map
 from numbers import Real
 import os
 from random import choice, uniform
-import struct
+import re
+from shutil import copy2
+import threading
 from typing import *
+# # #
+from .assetindex import AssetIndex
+from .pngchunks import OptimizedPNGCache
+from .texcache import TextureMetadataCache, atomic_open
 
 
 
@@ -24,7 +33,7 @@ Dumpable = Union[int, float, bool, list, None]
 # types that can be dumped into JSON
 Self = TypeVar("Self")
 # not needed since Python 3.11, but I'm using 3.8
-hook_ = {"namespaces": {}}
+hook_ = {"namespaces": {}, "layers": {}}
 
 
 
@@ -95,28 +104,28 @@ class Texture:
 
 	@cached_property
 	def size(self) -> Tuple[int, int]:
-		'''Read the size of the texture file. PNG-only.
+		'''Read the size of the texture file. PNG-only. Sizes are cached
+			across builds, see `TextureMetadataCache`.
 		'''
-		with open(self.texture_path, "rb") as file:
-			file.read(16)
-			# skip 16 bytes at the file head:
-			# 8-byte signature + 4-byte chunk length
-			# + 4-byte chunk type (header chunk here)
-			width, = struct.unpack(">I", file.read(4))
-			height, = struct.unpack(">I", file.read(4))
-		return width, height
+		return TextureMetadataCache().size_of(self.texture_path)
 
 	def bind_shortcut(self, name: str) -> Self:
 		self.bound_shortcut = str(name)
 		return self
 
-	def validate_path(self) -> Self:
+	def validate_path(self, trusted: bool = False) -> Self:
+		'''Check that the texture file exists, and resolve the full path of
+			a resource location.
+		# # #
+		`trusted`: only resolve the path, without checking the file, e.g.
+			when the path was validated before it was exported.
+		'''
 		if self._validated:
 			# has already been validated
 			return self
 		if self.texture_path is not None:
 			# instance created with non-resource location path
-			if not os.path.isfile(self.texture_path):
+			if not trusted and not os.path.isfile(self.texture_path):
 				raise FileNotFoundError("Bad texture path: '{}'".format(
 					self.texture_path))
 			self.texture_path = self.texture_path.replace("\\", "/")
@@ -127,13 +136,30 @@ class Texture:
 		if not os.path.splitext(path)[-1]:
 			# no extension, suppose PNG
 			path += ".png"
-		full_path = (hook_["namespaces"][ns] + f"/{ns}/textures/"
-			+ path.replace("\\", "/"))
-		if os.path.isfile(full_path):
+		if ns not in hook_["namespaces"]:
+			raise KeyError(f"Namespace '{ns}' is not defined.")
+		path = path.replace("\\", "/")
+		layers = hook_["layers"].get(ns, ())
+		if trusted and not layers:
+			self.texture_path = (hook_["namespaces"][ns]
+				+ f"/{ns}/textures/" + path)
+			self._validated = True
+			return self
+		resolver = AssetIndex().resolver([f"{root}/{ns}"
+			for root in (hook_["namespaces"][ns], *layers)])
+		# looked up in memory, see `AssetTree` and `AssetOverlay`
+		if (full_path := resolver.find("textures/" + path)) is None \
+			and trusted:
+			full_path = (hook_["namespaces"][ns] + f"/{ns}/textures/"
+				+ path)
+		if full_path is not None:
 			self.texture_path = full_path
 			self._validated = True
 			return self
-		raise FileNotFoundError(f"Bad resource location: '{ns}:{path}'")
+		hint = ", ".join("'{}:{}'".format(ns, re.sub(r"\.png$", "", found))
+			for found in resolver.suggest(path, within="textures"))
+		raise FileNotFoundError(f"Bad resource location: '{ns}:{path}'"
+			+ (f", did you mean {hint}?" if hint else ""))
 
 	def get_preferred_path(self) -> str:
 		'''Return resource locations if defined; otherwise full paths.
@@ -147,6 +173,138 @@ class Texture:
 			else:
 				return self.texture_path
 
+	@property
+	def data_URL(self) -> str:
+		'''The texture file as a data URL, see `DataURLCache`.
+		'''
+		return DataURLCache().get(self.texture_path)
+
+
+
+class BoundTexture(Texture):
+	'''A texture bound to a name in one annotation, sharing everything
+		else (validation, size, encoded payloads) with an interned texture.
+		See `TextureRegistry`.
+	'''
+
+	def __init__(self, shared: Texture,
+		resource_location: Optional[Tuple[str, str]] = None) -> None:
+		self.shared = shared
+		self.resource_location = resource_location
+		# as requested, for the same file can be referred to differently
+		self.bound_shortcut: Optional[str] = None
+
+	def __getattr__(self, name: str) -> Any:
+		# only called for attributes not found on the wrapper
+		if name == "shared":
+			raise AttributeError(name)
+		return getattr(self.shared, name)
+
+	def __repr__(self) -> str:
+		return f"BoundTexture(\"{self.texture_path}\")"
+
+	@property
+	def size(self) -> Tuple[int, int]:
+		return self.shared.size
+
+	@property
+	def data_URL(self) -> str:
+		return self.shared.data_URL
+
+	def validate_path(self, trusted: bool = False) -> Self:
+		self.shared.validate_path(trusted)
+		return self
+
+
+
+class TextureRegistry:
+	'''Textures interned by resolved path, so that annotations sharing a
+		texture file validate, measure and encode it only once.
+	# # #
+	Singleton class.
+	'''
+
+	__instance: "Optional[Self]" = None
+	__slots__ = ("_textures",)
+
+	def __new__(cls):
+		'''To make this singleton.
+		'''
+		if cls.__instance is None:
+			hold = super().__new__(cls)
+			hold._textures: Dict[str, Texture] = {}
+			# resolved path -> shared texture
+			cls.__instance = hold
+		return cls.__instance
+
+	def intern(self, texture_path: str) -> Texture:
+		'''Validate `texture_path` and return the shared texture of the file.
+		'''
+		return self.adopt(Texture(texture_path).validate_path())
+
+	def adopt(self, validated: Texture) -> Texture:
+		'''Return the shared texture of the file of `validated`, which is
+			shared from now on if the file is new.
+		'''
+		return self._textures.setdefault(validated.texture_path, validated)
+
+	def bind(self, texture_path: str, name: str,
+		shared: Optional[Texture] = None) -> BoundTexture:
+		'''Return a new `BoundTexture` named `name` over the shared texture.
+		# # #
+		`shared`: the shared texture if already interned.
+		'''
+		resource_location = (tuple(texture_path.split(":"))
+			if is_resource_location_like(texture_path) else None)
+		return BoundTexture(shared or self.intern(texture_path),
+			resource_location).bind_shortcut(name)
+
+	def clear(self) -> None:
+		self._textures.clear()
+
+
+
+def requested_path(texture: Texture) -> str:
+	'''The path of a texture as given, even if not validated.
+	'''
+	if texture.resource_location is not None:
+		return ":".join(texture.resource_location)
+	return texture.texture_path
+
+
+
+def prefetch_textures(textures: Iterable[Texture],
+	workers: Optional[int] = None) -> None:
+	'''Validate textures and read their metadata (see `Texture.size`) in a
+		thread pool, so that the file system calls overlap instead of
+		waiting on each other, which matters on network-mounted or cold
+		asset trees. Bad textures are reported together, in one
+		FileNotFoundError.
+	# # #
+	`workers`: the number of threads, by default as `ThreadPoolExecutor`.
+	'''
+	def probe(texture: Texture) -> None:
+		texture.validate_path()
+		target = texture.shared if isinstance(texture, BoundTexture) \
+			else texture
+		if "size" not in target.__dict__:
+			target.__dict__["size"] = TextureMetadataCache().size_of(
+				target.texture_path)
+			# fills the `cached_property` without its lock, which would
+			# serialize the threads (Python 3.8 to 3.11)
+	# # #
+	textures = list({id(tins): tins for tins in textures}.values())
+	with ThreadPoolExecutor(max_workers=workers) as executor:
+		futures = [executor.submit(probe, tins) for tins in textures]
+	bad: List[str] = []
+	for tins, fu in zip(textures, futures):
+		if (error := fu.exception()) is not None:
+			if not isinstance(error, (OSError, KeyError, ValueError)):
+				raise error
+			bad.append(f"'{requested_path(tins)}': {error}")
+	if bad:
+		raise FileNotFoundError("Bad textures:\n\t" + "\n\t".join(bad))
+
 
 
 def to_data_URL(path: str, file_type: str = ".png") -> str:
@@ -156,14 +314,138 @@ def to_data_URL(path: str, file_type: str = ".png") -> str:
 	`file_type`: the file type (name extension with or without the dot).
 		by default "png".
 	'''
+	return (data_URL_prefix(file_type)
+		+ base64.b64encode(embedded_bytes(path, file_type)).decode("ASCII"))
+
+
+
+def normalized_file_type(file_type: str) -> str:
 	file_type = file_type.strip().lower()
 	if not file_type.startswith("."):
 		file_type = "." + file_type
-	mime = mime_types_map[file_type]
+	return file_type
+
+
+
+def data_URL_prefix(file_type: str = ".png") -> str:
+	return f"data:{mime_types_map[normalized_file_type(file_type)]};base64,"
+
+
+
+def embedded_bytes(path: str, file_type: str = ".png") -> bytes:
+	'''Read a file as it is embedded into pages. PNG files are optimized
+		as `DataURLCache` is set to, see `optimize_PNG`.
+	'''
+	cache = DataURLCache()
+	if cache.optimize and normalized_file_type(file_type) == ".png":
+		return OptimizedPNGCache().get(path, cache.deflate_level)
 	with open(path, "rb") as file:
-		data = file.read()
-	return (f"data:{mime};base64,"
-		+ base64.b64encode(data).decode("ASCII"))
+		return file.read()
+
+
+
+class DataURLCache:
+	'''Least recently used data URLs, keyed by the content hash of files,
+		so that files embedded into several pages are encoded once.
+	# # #
+	Singleton class.
+	`capacity`: total length of the cached data URLs, in characters.
+	`max_entry`: data URLs longer than this are never cached; they are only
+		streamed by `write_data_URL`.
+	`optimize`: whether PNG files are stripped of metadata before encoded,
+		see `optimize_PNG`.
+	`deflate_level`: if not None, PNG image data is also deflated again at
+		this zlib level, when optimized.
+	'''
+
+	__instance: "Optional[Self]" = None
+	__slots__ = ("_entries", "_total", "capacity", "max_entry", "optimize",
+		"deflate_level")
+
+	def __new__(cls):
+		'''To make this singleton.
+		'''
+		if cls.__instance is None:
+			hold = super().__new__(cls)
+			hold._entries: "OrderedDict[tuple, str]" = OrderedDict()
+			# (content hash, file type, optimize, deflate level) -> data URL,
+			# least recent first
+			hold._total = 0
+			hold.capacity = 64 * 2 ** 20
+			hold.max_entry = 16 * 2 ** 20
+			hold.optimize = True
+			hold.deflate_level: Optional[int] = None
+			cls.__instance = hold
+		return cls.__instance
+
+	def _key(self, path: str,
+		file_type: str) -> Tuple[str, str, bool, Optional[int]]:
+		return (TextureMetadataCache().digest_of(path), file_type,
+			self.optimize, self.deflate_level)
+
+	def peek(self, path: str, file_type: str = ".png") -> Optional[str]:
+		'''Return the cached data URL of `path`, or None if not cached.
+		'''
+		key = self._key(path, file_type)
+		if (found := self._entries.get(key)) is not None:
+			self._entries.move_to_end(key)
+		return found
+
+	def put(self, path: str, data_URL: str, file_type: str = ".png") -> None:
+		if len(data_URL) > self.max_entry:
+			return
+		key = self._key(path, file_type)
+		if key in self._entries:
+			self._total -= len(self._entries.pop(key))
+		self._entries[key] = data_URL
+		self._total += len(data_URL)
+		while self._total > self.capacity:
+			self._total -= len(self._entries.popitem(last=False)[1])
+
+	def get(self, path: str, file_type: str = ".png") -> str:
+		if (found := self.peek(path, file_type)) is None:
+			found = to_data_URL(path, file_type)
+			self.put(path, found, file_type)
+		return found
+
+	def clear(self) -> None:
+		self._entries.clear()
+		self._total = 0
+
+
+
+def write_data_URL(file: IO[str], path: str, file_type: str = ".png",
+	chunk_size: int = 3 * 2 ** 16) -> None:
+	'''Write a file into a text file handle as base64 data URL, encoding
+		fixed-size chunks instead of the whole file at once. The result is
+		the same as `to_data_URL`.
+	# # #
+	`chunk_size`: bytes read each time, a multiple of 3 so that chunks
+		encode without padding in between.
+	'''
+	cache = DataURLCache()
+	if (found := cache.peek(path, file_type)) is not None:
+		file.write(found)
+		return
+	if cache.optimize and normalized_file_type(file_type) == ".png":
+		source = OptimizedPNGCache().stream(path, cache.deflate_level)
+		# optimized once and cached on disk, see `optimize_PNG`
+	else:
+		source = open(path, "rb")
+	chunk_size -= chunk_size % 3
+	kept: List[str] = [data_URL_prefix(file_type)]
+	file.write(kept[0])
+	with source:
+		keep = (source.seek(0, os.SEEK_END) * 4 + 2) // 3 <= cache.max_entry
+		# also keep small payloads for the next pages
+		source.seek(0)
+		while chunk := source.read(chunk_size):
+			encoded = base64.b64encode(chunk).decode("ASCII")
+			file.write(encoded)
+			if keep:
+				kept.append(encoded)
+	if keep:
+		cache.put(path, "".join(kept), file_type)
 
 
 
@@ -179,6 +461,14 @@ def handle_direction_string(
 
 
 
+def direction_string(axis: Literal["x", "y"], sign: bool) -> str:
+	'''The inverse of `handle_direction_string`, given the axis and the
+		sign of a clip direction (as `get_clip_direction` returns).
+	'''
+	return ("+" if sign else "-") + axis
+
+
+
 def validated_id(id_: str) -> str:
 	'''To check whether an ID is valid (matches [0-9a-zA-Z_]* only).
 		If not, error is raised.
@@ -194,6 +484,27 @@ def validated_id(id_: str) -> str:
 
 
 
+def validated_ids(ids: Iterable[str]) -> List[str]:
+	'''Batch version of `validated_id`, also checking that there are no
+		duplicates among `ids`. The characters are checked once over the
+		whole batch.
+	'''
+	ids = list(ids)
+	if (bad := [id_ for id_ in ids if not isinstance(id_, str)]):
+		raise ValueError(f"ID must be a string, not {bad[0].__class__}")
+	legal_chars = ("0123456789" "abcdefghijklmnopqrstuvwxyz"
+		"ABCDEFGHIJKLMNOPQRSTUVWXYZ" "_")
+	if set("".join(ids)) - set(legal_chars):
+		# find the culprit only when there is one
+		for id_ in ids:
+			validated_id(id_)
+	if len(set(ids)) != len(ids):
+		seen: Set[str] = set()
+		duplicates = [id_ for id_ in ids if id_ in seen or seen.add(id_)]
+		raise ValueError(f"Duplicate IDs: {sorted(set(duplicates))}.")
+	return ids
+
+
 def camel_case(id_: str) -> str:
 	'''Convert snake case string to camel case.
 	'''
@@ -202,20 +513,68 @@ def camel_case(id_: str) -> str:
 
 
 
+class OrdinalTables:
+	'''The ordinal series in the path "./ordinaldata/*.txt", each read once
+		per process and shared by all the annotations.
+	# # #
+	Singleton class.
+	'''
+
+	__instance: "Optional[Self]" = None
+	__slots__ = ("_tables", "_lock")
+
+	def __new__(cls):
+		'''To make this singleton.
+		'''
+		if cls.__instance is None:
+			hold = super().__new__(cls)
+			hold._tables: Dict[str, str] = {}
+			# series name -> its characters
+			hold._lock = threading.Lock()
+			cls.__instance = hold
+		return cls.__instance
+
+	def get(self, ord_name: str) -> str:
+		if (found := self._tables.get(ord_name)) is None:
+			with self._lock:
+				if (found := self._tables.get(ord_name)) is None:
+					with open(os.path.dirname(__file__)
+						+ f"/ordinaldata/{ord_name}.txt", "r",
+						encoding="utf-8") as dfile:
+						found = self._tables[ord_name] = dfile.read().strip()
+		return found
+
+
+
+def ordinal(ord_name: str, n: int) -> str:
+	'''The `n`-th (from 0) ordinal symbol of series `ord_name`. Past the
+		end of the series, symbols are made of more characters, counted as
+		bijective numerals (..., y, z, aa, ab, ..., zz, aaa, ...), so that
+		every `n` has its own symbol.
+	'''
+	table = OrdinalTables().get(ord_name)
+	if n < 0:
+		raise ValueError("`n` must not be negative.")
+	if n < len(table):
+		return table[n]
+	digits: List[str] = []
+	n += 1
+	while n:
+		n, rem = divmod(n - 1, len(table))
+		digits.append(table[rem])
+	return "".join(reversed(digits))
+
+
+
 def ordinals(ord_name: str) -> Generator[str, None, None]:
 	'''Get cyclic ordinal characters (e.g. a, b, c; 甲, 乙, 丙; ...)
 		of series `ord_name`. It is recommended that a series contains
 		at least 40 characters, for a typical GUI might require so
 		many ones to annotate.
-	The series are specified in the path "./ordinaldata/*.txt".
+	The series are specified in the path "./ordinaldata/*.txt", see
+		`OrdinalTables`. For symbols that never repeat, see `ordinal`.
 	'''
-	def _() -> Generator[str, None, None]:
-		with open(os.path.dirname(__file__)
-			+ f"/ordinaldata/{ord_name}.txt", "r",
-			encoding="utf-8") as dfile:
-			ord_nums = dfile.read().strip()
-		yield from ord_nums
-	return cycle(_())
+	return cycle(OrdinalTables().get(ord_name))
 
 
 def color_series(series_name: str) -> Generator[str, None, None]:
@@ -417,66 +776,248 @@ class AssignmentStatementProvider:
 
 
 
+JSON_ENCODER = json.JSONEncoder(ensure_ascii=False, separators=(",", ":"))
+# compact, and backed by the C encoder
+HtmlRow = Tuple[Optional[str], Optional[str], List[str], Dict[str, Dumpable]]
+# id, content, additional classes, data
+
+
+
+def script_JSON(obj: Any) -> str:
+	'''Encode `obj` as compact JSON that is safe inside a <script> block.
+	'''
+	return JSON_ENCODER.encode(obj).replace("<", "\\u003c")
+	# no "</script>" or "<!--" can appear
+
+
+
+def escape_attribute(text: str) -> str:
+	'''Escape text for a single-quoted HTML attribute.
+	'''
+	if "&" in text or "'" in text or "<" in text:
+		return (text.replace("&", "&amp;").replace("'", "&#39;")
+			.replace("<", "&lt;"))
+	return text
+
+
+
 class HtmlProvider:
 	'''A class used to provide HTML elements.
 	# # #
 	Structure of an element:
 		<`tag` id="..." class="`classes`..." onclick="`onclick`"
-		data="`data`...">
+		data='`data`...'>
 			`content`
 		</`tag`>
-	where `data` can be parsed as a JSON object.
+	where `data` is a JSON object.
+	The element is split into static pieces once, rendering only joins
+		them with the values.
+	Used by `Marker.to_HTML` and `Element.to_HTML`. Webpages are not built
+		from these elements but from the marker payload, see
+		`Marker.to_HTML_row`.
 	'''
 
 	def __init__(self, tag: str,
 		classes: Optional[List[str]] = None,
 		onclick: Optional[str] = None
 	) -> None:
-		stream: List[str] = [str(tag)]
-		stream.append("id=\"{}\"") # slot 1
-		if classes is not None:
-			stream.append("class=\"{}$ac$\"".format(" ".join(classes)))
-			# $ac$ is a placeholder for additional classes
-			# a slot is not used here for convenience
-		else:
-			steam.append("class=\"$ac$\"")
-		if onclick is not None:
-			stream.append(f"onclick=\"{onclick}\"")
-		self.template = ("<{}".format(" ".join(stream))
-			+ "{}>" + "{}" + f"</{tag}>"
-			#  ^2      ^3
-			# 2: this slot is reserved for potential `data` field, and
-			# should be preceded by a space
-			# 3: this slot is reserved for `content` field
-		)
+		self.classes = " ".join(classes) if classes else ""
+		self.head = f"<{tag} id=\""
+		# followed by the id
+		self.middle = f"\" class=\"{self.classes}"
+		# followed by additional classes
+		self.after_classes = "\"" + (f" onclick=\"{onclick}\""
+			if onclick is not None else "")
+		# followed by the data attribute, if any
+		self.tail = f"</{tag}>"
+		# preceded by the content
 
 	def __call__(self, id_: Optional[str] = None,
 		content: Optional[str] = None, additional_classes: List[str] = [],
-		**data: str) -> str:
-		def to_JSON_lit(obj: Any) -> str:
-			'''A simple converter to turn objects into legal JSON literals.
-			'''
-			if isinstance(obj, bool):
-				return str(obj).lower()
-			elif isinstance(obj, str):
-				return '"' + obj + '"'
-			elif obj is None:
-				return "null"
-			elif isinstance(obj, float):
-				return str(round(obj, 5))
+		**data: Dumpable) -> str:
+		return self.render((id_, content, additional_classes, data))
+
+	def render(self, row: HtmlRow) -> str:
+		id_, content, additional_classes, data = row
+		if additional_classes:
+			ac = " ".join(additional_classes)
+			ac = " " + ac if self.classes else ac
+		else:
+			ac = ""
+		if data:
+			for k, v in data.items():
+				if v.__class__ is float:
+					data = {k: (round(v, 5) if v.__class__ is float else v)
+						for k, v in data.items()}
+					break
+			data_string = " data='" + escape_attribute(
+				JSON_ENCODER.encode(data)) + "'"
+		else:
+			data_string = ""
+		return "".join((self.head, str(id_), self.middle, ac,
+			self.after_classes, data_string, ">",
+			"" if content is None else html_escape(str(content), False),
+			self.tail))
+
+
+
+BLOCKS_BASE = os.path.dirname(__file__).replace("\\", "/") + "/blocks/"
+# the HTML frame, language files and page sources
+
+
+
+class PageTemplate:
+	'''The HTML frame compiled for one (lang, embed, renderer) combination:
+		every slot but "$elements$" filled in, leaving the static text
+		before and after it. Compiled templates are cached, and recompiled
+		when any of their source files changes.
+	# # #
+	These slots should be defined in the HTML frame:
+		$stylesheet$, $langdict$, $scripts$, $iconsrc$, $elements$
+	`renderer`: how the page shows markers.
+		"dom": as one element each.
+		"canvas": drawn on one canvas per texture, see canvasrender.js.
+	'''
+
+	RENDERER_SCRIPTS: ClassVar[Dict[str, Tuple[str, ...]]] = {
+		"dom": ("arrangement", "interaction"),
+		"canvas": ("arrangement", "interaction", "canvasrender")
+	} # JavaScript file names used
+	_compiled: ClassVar[Dict[Tuple[str, bool, str], "PageTemplate"]] = {}
+
+	def __init__(self, lang: str, embed: bool,
+		renderer: Literal["dom", "canvas"] = "dom") -> None:
+		if renderer not in self.RENDERER_SCRIPTS:
+			raise ValueError("Unsupported value for `renderer`.")
+		self.lang = lang
+		self.embed = embed
+		self.renderer = renderer
+		self.scripts = self.RENDERER_SCRIPTS[renderer]
+		lang_path = BLOCKS_BASE + f"lang/{lang}.json"
+		if not os.path.exists(lang_path):
+			# look for the language file
+			raise ValueError(f"Language file `{lang}.json` does not exist.")
+		self.sources: List[str] = [BLOCKS_BASE + "frame.html", lang_path]
+		if embed:
+			self.sources.append(BLOCKS_BASE + "sources/magcotstyle.css")
+			self.sources += [BLOCKS_BASE + f"sources/{js}.js"
+				for js in self.scripts]
+			self.sources.append(BLOCKS_BASE + "sources/icon.png")
+		self.mtimes = [os.stat(src).st_mtime_ns for src in self.sources]
+		# taken before reading, so that changes while reading are caught
+		slots = self.fill_slots(lang_path)
+		with open(BLOCKS_BASE + "frame.html", "r",
+			encoding="utf-8") as frame_file:
+			pieces = re.split(r"\$(\w+)\$", frame_file.read())
+		# static texts and slot names, alternately
+		self.head: str = ""
+		self.tail: Optional[str] = None
+		# texts before and after $elements$
+		for i, piece in enumerate(pieces):
+			if i % 2 == 1 and piece == "elements":
+				self.tail = ""
+				continue
+			text = slots.get(piece, f"${piece}$") if i % 2 else piece
+			if self.tail is None:
+				self.head += text
 			else:
-				return str(obj)
-				# this is not accurate, but enough for most usages here
-		# # #
-		if not data:
-			return self.template.format(id_, "", content)
-		data_string = (" data='{"
-			+ ",".join("\"{}\":{}".format(k, to_JSON_lit(v))
-				for k, v in data.items())
-			+ "}'"
-		)
-		# there are, of cource, some better ways to do this
-		built = self.template.format(id_, data_string, content)
-		built = built.replace("$ac$",
-			" " + " ".join(additional_classes) if additional_classes else "")
-		return built
\ No newline at end of file
+				self.tail += text
+		if self.tail is None:
+			raise ValueError("The HTML frame has no `$elements$` slot.")
+
+	def fill_slots(self, lang_path: str) -> Dict[str, str]:
+		with open(lang_path, "r", encoding="utf-8") as lang_file:
+			lang_dict = json.load(lang_file)
+		slots: Dict[str, str] = {}
+		slots["langdict"] = ('<script type="text/javascript">\n\t\t'
+			'langEntries = {{\n\t\t\t'
+			'{}\n\t\t'
+			'}}\n\t</script>'.format(
+				"\n\t\t\t".join(
+					'"{}": "{}",'.format(k, v)
+					for k, v in lang_dict.items()
+				)
+			)
+		) # $langdict$ is filled by the same way regardless of `embed`
+		if not self.embed:
+			slots["stylesheet"] = ('<link rel="stylesheet" type="text/css" '
+				'href="./sources/magcotstyle.css">')
+			slots["scripts"] = self.renderer_script() + "\n\t".join(
+				'<script type="text/javascript" '
+				f'src="./sources/{js}.js"></script>' for js in self.scripts)
+			slots["iconsrc"] = "./sources/icon.png"
+			return slots
+		# embed all the files
+		with open(BLOCKS_BASE + "sources/magcotstyle.css", "r",
+			encoding="utf-8") as file:
+			read_text = file.read()
+		slots["stylesheet"] = ('<style type="text/css">\n'
+			+ "\n".join("\t\t" + ln for ln in read_text.splitlines())
+			+ '\n\t</style>')
+		JS_texts: List[str] = []
+		for js in self.scripts:
+			with open(BLOCKS_BASE + f"sources/{js}.js", "r",
+				encoding="utf-8") as file:
+				read_text = file.read()
+			JS_texts.append('<script type="text/javascript">\n'
+				+ "\n".join("\t\t" + ln for ln in read_text.splitlines())
+				+ '\n\t</script>')
+		slots["scripts"] = self.renderer_script() + "\n\t".join(JS_texts)
+		slots["iconsrc"] = to_data_URL(BLOCKS_BASE + "sources/icon.png")
+		return slots
+
+	def renderer_script(self) -> str:
+		'''Tell the page scripts the renderer, unless it is the default.
+		'''
+		if self.renderer == "dom":
+			return ""
+		return ('<script type="text/javascript">'
+			f'var rendererMode = "{self.renderer}"</script>\n\t')
+
+	def is_stale(self) -> bool:
+		try:
+			return any(os.stat(src).st_mtime_ns != mt
+				for src, mt in zip(self.sources, self.mtimes))
+		except OSError:
+			return True
+
+	@classmethod
+	def of(cls, lang: str, embed: bool,
+		renderer: Literal["dom", "canvas"] = "dom") -> Self:
+		'''Return the compiled template, compiling it if not cached or
+			stale.
+		'''
+		key = (str(lang), bool(embed), str(renderer))
+		found = cls._compiled.get(key)
+		if found is None or found.is_stale():
+			found = cls._compiled[key] = cls(*key)
+		return found
+
+	def render(self, file: IO[str], elements: Callable[[IO[str]], None]
+		) -> None:
+		'''Write the page into a text file handle. `elements` writes what
+			goes in the place of `$elements$`.
+		'''
+		file.write(self.head)
+		elements(file)
+		file.write(self.tail)
+
+
+
+def copy_sources(destination: str) -> None:
+	'''Copy the page sources (for pages not embedding them) into
+		`destination`, skipping files already up to date.
+	'''
+	os.makedirs(destination, exist_ok=True)
+	with os.scandir(BLOCKS_BASE + "sources") as entries:
+		for entry in entries:
+			target = os.path.join(destination, entry.name)
+			stat = entry.stat()
+			try:
+				found = os.stat(target)
+				if found.st_size == stat.st_size and \
+					found.st_mtime_ns == stat.st_mtime_ns:
+					continue
+			except OSError:
+				pass
+			copy2(entry.path, target)
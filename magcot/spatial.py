@@ -0,0 +1,212 @@
+'''Here defines spatial data structures over the rectangular regions of
+	GUI elements.
+# # #
+Regions are half-open rectangles (x0, y0, x1, y1), i.e. a region covers
+	the pixel (x, y) if x0 <= x < x1 and y0 <= y < y1. Two regions that
+	merely share an edge do not intersect.
+'''
+
+from bisect import bisect_left, insort
+from typing import *
+
+
+
+Region = Tuple[int, int, int, int]
+EMPTY: Region = (0, 0, 0, 0)
+
+
+
+def intersects(a: Region, b: Region) -> bool:
+	return a[0] < b[2] and b[0] < a[2] and a[1] < b[3] and b[1] < a[3]
+
+
+
+def contains(outer: Region, inner: Region) -> bool:
+	return (outer[0] <= inner[0] and inner[2] <= outer[2]
+		and outer[1] <= inner[1] and inner[3] <= outer[3])
+
+
+
+class GridIndex:
+	'''A uniform grid (buckets of `cell_size` * `cell_size` pixels) over
+		regions, each carrying an arbitrary payload.
+	# # #
+	Insertion, removal and update are incremental. Queries only visit the
+		buckets they overlap, and results are given in insertion order.
+	Removed regions leave empty slots behind, so that the slots of the
+		others do not change.
+	'''
+
+	def __init__(self, cell_size: int = 16) -> None:
+		self.cell_size = int(cell_size)
+		self.regions: List[Region] = []
+		self.payloads: List[Any] = []
+		self.buckets: Dict[Tuple[int, int], List[int]] = {}
+		self._bounds: Optional[Region] = None
+		# the range of occupied cells, (cx0, cy0, cx1, cy1) inclusive
+		# not shrunk by removal
+		self._removed = 0
+
+	def __len__(self) -> int:
+		return len(self.regions) - self._removed
+
+	def _cell_range(self, region: Region) -> Region:
+		'''Cells covered by `region`, inclusive on both ends.
+		'''
+		cs = self.cell_size
+		return (region[0] // cs, region[1] // cs,
+			(region[2] - 1) // cs, (region[3] - 1) // cs)
+
+	def _cells(self, region: Region) -> Iterator[Tuple[int, int]]:
+		if region[2] <= region[0] or region[3] <= region[1]:
+			return
+		cx0, cy0, cx1, cy1 = self._cell_range(region)
+		for cx in range(cx0, cx1 + 1):
+			for cy in range(cy0, cy1 + 1):
+				yield cx, cy
+
+	def insert(self, region: Region, payload: Any) -> int:
+		'''Add a region. Empty regions are kept but never found. Return its
+			slot.
+		'''
+		index = len(self.regions)
+		self.regions.append(region)
+		self.payloads.append(payload)
+		self._place(index)
+		return index
+
+	def _place(self, index: int) -> None:
+		region = self.regions[index]
+		for cell in self._cells(region):
+			insort(self.buckets.setdefault(cell, []), index)
+			# kept ascending, i.e. in insertion order
+		if region[2] <= region[0] or region[3] <= region[1]:
+			return
+		cx0, cy0, cx1, cy1 = self._cell_range(region)
+		if self._bounds is None:
+			self._bounds = (cx0, cy0, cx1, cy1)
+		else:
+			bx0, by0, bx1, by1 = self._bounds
+			self._bounds = (min(bx0, cx0), min(by0, cy0),
+				max(bx1, cx1), max(by1, cy1))
+
+	def _unplace(self, index: int) -> None:
+		for cell in self._cells(self.regions[index]):
+			bucket = self.buckets[cell]
+			del bucket[bisect_left(bucket, index)]
+			if not bucket:
+				del self.buckets[cell]
+
+	def remove(self, index: int) -> None:
+		'''Remove the region at slot `index`.
+		'''
+		if self.payloads[index] is None:
+			return
+		self._unplace(index)
+		self.regions[index] = EMPTY
+		self.payloads[index] = None
+		self._removed += 1
+
+	def update(self, index: int, region: Region) -> None:
+		'''Move the region at slot `index` to `region`, keeping its payload
+			and its place in the insertion order.
+		'''
+		self._unplace(index)
+		self.regions[index] = region
+		self._place(index)
+
+	def query_point(self, x: int, y: int) -> List[Any]:
+		'''Payloads of the regions covering the pixel (x, y).
+		'''
+		cs = self.cell_size
+		return [self.payloads[i]
+			for i in self.buckets.get((x // cs, y // cs), ())
+			if intersects(self.regions[i], (x, y, x + 1, y + 1))]
+
+	def query_rect(self, region: Region,
+		contained: bool = False) -> List[Any]:
+		'''Payloads of the regions intersecting `region`, or only of those
+			entirely inside `region` if `contained` is True.
+		'''
+		if (self._bounds is None
+			or region[2] <= region[0] or region[3] <= region[1]):
+			return []
+		cx0, cy0, cx1, cy1 = self._cell_range(region)
+		bx0, by0, bx1, by1 = self._bounds
+		# do not visit cells that can never be occupied
+		found: Set[int] = set()
+		for cx in range(max(cx0, bx0), min(cx1, bx1) + 1):
+			for cy in range(max(cy0, by0), min(cy1, by1) + 1):
+				found.update(self.buckets.get((cx, cy), ()))
+		test = contains if contained else intersects
+		return [self.payloads[i] for i in sorted(found)
+			if test(region, self.regions[i])]
+
+
+
+def find_intersections(regions: Sequence[Region]) -> List[Tuple[int, int]]:
+	'''Find all the pairs (i, j), i < j, of intersecting regions, with
+		a sweep line along x.
+	# # #
+	The sweep keeps the y-intervals of the regions crossing the line in
+		a segment tree (for regions containing the lower edge of a new
+		one) and in a list sorted by lower edges (for those starting
+		inside a new one), so each intersection is reported exactly once,
+		in O(n log n + k) for n regions and k intersections (the sorted
+		list is a plain Python list, whose insertions move memory in bulk).
+	'''
+	valid = [i for i, r in enumerate(regions) if r[0] < r[2] and r[1] < r[3]]
+	ys = sorted({regions[i][1] for i in valid}
+		| {regions[i][3] for i in valid})
+	y_rank = {y: k for k, y in enumerate(ys)}
+	size = 1
+	while size < len(ys):
+		size *= 2
+	nodes: List[Set[int]] = [set() for _ in range(2 * size)]
+	# leaf `size + k` is the elementary interval [ys[k], ys[k + 1])
+
+	def cover(i: int, insert: bool) -> None:
+		'''Put (or remove) region `i` to the canonical nodes of its
+			y-interval.
+		'''
+		lo = y_rank[regions[i][1]] + size
+		hi = y_rank[regions[i][3]] + size
+		while lo < hi:
+			if lo & 1:
+				nodes[lo].add(i) if insert else nodes[lo].discard(i)
+				lo += 1
+			if hi & 1:
+				hi -= 1
+				nodes[hi].add(i) if insert else nodes[hi].discard(i)
+			lo //= 2
+			hi //= 2
+
+	events: List[Tuple[int, int, int]] = []
+	for i in valid:
+		events.append((regions[i][0], 1, i))
+		events.append((regions[i][2], 0, i))
+	events.sort()
+	# at the same x, regions leave before others enter, so that regions
+	# sharing an edge are not reported
+	starts: List[Tuple[int, int]] = []
+	# (y0, i) of the regions crossing the sweep line, sorted
+	found: List[Tuple[int, int]] = []
+	for _, entering, i in events:
+		y0, y1 = regions[i][1], regions[i][3]
+		if not entering:
+			cover(i, False)
+			del starts[bisect_left(starts, (y0, i))]
+			continue
+		node = y_rank[y0] + size
+		while node:
+			# regions containing y0
+			found.extend((min(i, j), max(i, j)) for j in nodes[node])
+			node //= 2
+		for _, j in starts[bisect_left(starts, (y0 + 1,)):
+			bisect_left(starts, (y1,))]:
+			# regions starting strictly between y0 and y1
+			found.append((min(i, j), max(i, j)))
+		cover(i, True)
+		insort(starts, (y0, i))
+	found.sort()
+	return found
@@ -0,0 +1,190 @@
+'''Here defines the persistent cache of texture metadata, so that textures
+	unchanged since the last build are not opened again.
+'''
+
+import atexit
+from contextlib import contextmanager
+import hashlib
+import json
+import os
+import secrets
+import struct
+import threading
+from typing import *
+
+
+
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+CACHE_VERSION = 1
+TEMP_FLAGS = os.O_WRONLY | os.O_CREAT | os.O_EXCL | getattr(os, "O_BINARY", 0)
+# `open` translates line breaks itself
+
+
+
+@contextmanager
+def atomic_open(path: str, mode: str = "w",
+	**kwargs: Any) -> Iterator[IO]:
+	'''Open a temporary file beside `path` for writing, which replaces `path`
+		only if the block exits without an error. Readers never see a
+		half-written file.
+	# # #
+	`kwargs`: passed to `open`, e.g. `encoding`.
+	'''
+	folder = os.path.dirname(os.path.abspath(path))
+	os.makedirs(folder, exist_ok=True)
+	while True:
+		temp_path = os.path.join(folder, ".tmp-{}{}".format(
+			secrets.token_hex(8), os.path.splitext(path)[-1]))
+		try:
+			fd = os.open(temp_path, TEMP_FLAGS, 0o666)
+			# the umask applies as with `open`, unlike `mkstemp` (0o600)
+			break
+		except FileExistsError:
+			continue
+	try:
+		with open(fd, mode, **kwargs) as file:
+			yield file
+		os.replace(temp_path, path)
+	except BaseException:
+		os.unlink(temp_path)
+		raise
+
+
+
+class TextureMetadata(NamedTuple):
+	mtime: int
+	# in nanoseconds
+	length: int
+	# file size in bytes
+	size: Tuple[int, int]
+	# width, height; (0, 0) if not a PNG file
+	valid: bool
+	# whether the file is a PNG file
+	digest: str
+	# SHA-256 of the file content
+
+
+
+def read_metadata(path: str, stat: os.stat_result) -> TextureMetadata:
+	'''Read the dimensions and the content hash of a texture file.
+	'''
+	with open(path, "rb") as file:
+		content = file.read()
+	valid = content[:8] == PNG_SIGNATURE and content[12:16] == b"IHDR"
+	# 8-byte signature + 4-byte chunk length, then the header chunk
+	size = struct.unpack(">II", content[16:24]) if valid else (0, 0)
+	return TextureMetadata(stat.st_mtime_ns, stat.st_size, tuple(size),
+		valid, hashlib.sha256(content).hexdigest())
+
+
+
+def default_cache_path() -> str:
+	'''`MAGCOT_TEXTURE_CACHE` if set (empty to keep the cache in memory
+		only), otherwise under the user cache folder.
+	'''
+	if "MAGCOT_TEXTURE_CACHE" in os.environ:
+		return os.environ["MAGCOT_TEXTURE_CACHE"]
+	cache_home = os.environ.get("XDG_CACHE_HOME",
+		os.path.join(os.path.expanduser("~"), ".cache"))
+	return os.path.join(cache_home, "magcot", "textures.json")
+
+
+
+class TextureMetadataCache:
+	'''Metadata of texture files, keyed by absolute path and checked against
+		mtime and file size. Loaded from disk when first used, and written
+		back (atomically, merged with what other processes wrote meanwhile)
+		at exit if anything new was read.
+	# # #
+	Singleton class.
+	'''
+
+	__instance: "Optional[Self]" = None
+	__creation = threading.Lock()
+	# first created from the threads of `prefetch_textures`
+	__slots__ = ("path", "_entries", "_fresh", "_gone")
+
+	def __new__(cls):
+		'''To make this singleton.
+		'''
+		if cls.__instance is not None:
+			return cls.__instance
+		with cls.__creation:
+			if cls.__instance is None:
+				hold = super().__new__(cls)
+				hold.path: str = default_cache_path()
+				hold._entries: Dict[str, TextureMetadata] = hold._read_disk()
+				hold._fresh: Dict[str, TextureMetadata] = {}
+				# entries read in this process, not saved yet
+				hold._gone: Set[str] = set()
+				# paths of cached entries found missing in this process
+				cls.__instance = hold
+				atexit.register(hold.save)
+		return cls.__instance
+
+	def _read_disk(self) -> Dict[str, TextureMetadata]:
+		if not self.path:
+			return {}
+		try:
+			with open(self.path, encoding="utf-8") as file:
+				loaded = json.load(file)
+		except (OSError, ValueError):
+			# missing or corrupted, start over
+			return {}
+		if loaded.get("version") != CACHE_VERSION:
+			return {}
+		return {path: TextureMetadata(mt, ln, tuple(size), valid, digest)
+			for path, (mt, ln, size, valid, digest)
+			in loaded["entries"].items()}
+
+	def save(self) -> None:
+		'''Write the entries read in this process back to disk, without
+			those of files that no longer exist.
+		'''
+		if not self.path or not (self._fresh or self._gone):
+			return
+		merged = self._read_disk()
+		merged.update(self._fresh)
+		merged = {path: en for path, en in merged.items()
+			if path in self._fresh or os.path.isfile(path)}
+		# only checked when written anyway
+		try:
+			with atomic_open(self.path, "w", encoding="utf-8") as file:
+				json.dump({"version": CACHE_VERSION, "entries": {
+					path: [en.mtime, en.length, list(en.size), en.valid,
+						en.digest] for path, en in merged.items()
+				}}, file, separators=(",", ":"))
+		except OSError:
+			# the cache is only an optimization
+			return
+		self._entries = merged
+		self._fresh.clear()
+		self._gone.clear()
+
+	def lookup(self, path: str) -> TextureMetadata:
+		'''Metadata of the texture file at `path`. The file is only opened if
+			it changed since cached.
+		'''
+		path = os.path.abspath(path)
+		try:
+			stat = os.stat(path)
+		except FileNotFoundError:
+			if self._entries.pop(path, None) is not None:
+				self._gone.add(path)
+			self._fresh.pop(path, None)
+			raise
+		found = self._entries.get(path)
+		if found is None or found.mtime != stat.st_mtime_ns or \
+			found.length != stat.st_size:
+			found = self._entries[path] = self._fresh[path] = \
+				read_metadata(path, stat)
+		return found
+
+	def size_of(self, path: str) -> Tuple[int, int]:
+		found = self.lookup(path)
+		if not found.valid:
+			raise ValueError(f"'{path}' is not a PNG file.")
+		return found.size
+
+	def digest_of(self, path: str) -> str:
+		return self.lookup(path).digest
@@ -0,0 +1,35 @@
+'''Fixtures shared by the tests.
+'''
+
+import struct
+import zlib
+
+import pytest
+
+from magcot import define_namespace
+from magcot.texcache import PNG_SIGNATURE
+
+
+
+def write_png(path, width, height):
+	def chunk(kind, data):
+		return (struct.pack(">I", len(data)) + kind + data
+			+ struct.pack(">I", zlib.crc32(kind + data)))
+	rows = b"".join(b"\0" + b"\0\0\0\0" * width for _ in range(height))
+	with open(path, "wb") as file:
+		file.write(PNG_SIGNATURE
+			+ chunk(b"IHDR", struct.pack(">IIBBBBB", width, height, 8, 6, 0,
+				0, 0))
+			+ chunk(b"IDAT", zlib.compress(rows)) + chunk(b"IEND", b""))
+
+
+
+@pytest.fixture
+def assets(tmp_path, monkeypatch):
+	monkeypatch.setenv("MAGCOT_TEXTURE_CACHE", "")
+	folder = tmp_path / "assets" / "demo" / "textures" / "gui"
+	folder.mkdir(parents=True)
+	write_png(folder / "main.png", 176, 166)
+	write_png(folder / "bars.png", 64, 64)
+	define_namespace("demo", str(tmp_path / "assets"))
+	return tmp_path
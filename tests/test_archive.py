@@ -0,0 +1,33 @@
+'''Binary archives written by `GuiAnnotation.to_binary`.
+'''
+
+from magcot import *
+from magcot.archive import Archive
+
+
+
+def annotate():
+	a = GuiAnnotation("demo:gui/main")
+	a @ ("demo:gui/bars", "b")
+	a + "machine"
+	a - ItemSlot.of("s0", (8, 84))
+	a - FluidTank.of("tank", (10, 10), (16, 50), "+y")
+	a - ProgressBar.of("arrow", (80, 35), (22, 15), "+x", "b")
+	return a
+
+
+
+def test_round_trip(assets):
+	path = str(assets / "gui.mgct")
+	a = annotate()
+	a.to_binary(path)
+	with Archive(path) as archive:
+		assert archive.element_ids() == ["s0", "tank", "arrow"]
+	assert archive.buffer.closed
+	lazy = GuiAnnotation.load_binary(path)
+	assert lazy.serialize() == a.serialize()
+	eager = GuiAnnotation.load_binary(path, lazy=False)
+	eager.to_binary(path)
+	# the archive is closed already
+	assert eager.serialize() == a.serialize()
+	assert GuiAnnotation.load_binary(path).serialize() == a.serialize()
@@ -0,0 +1,25 @@
+'''Batch builds of annotation scripts.
+'''
+
+from magcot.batch import build_all
+
+
+
+def test_exiting_script_fails_alone(assets):
+	scripts = assets / "scripts"
+	scripts.mkdir()
+	(scripts / "one.py").write_text("from magcot import *\n"
+		"a = GuiAnnotation(\"demo:gui/main\")\n"
+		"a - ItemSlot.of(\"s0\", (8, 84))\n")
+	(scripts / "bad.py").write_text("import sys\nsys.exit(3)\n")
+	(scripts / "main.py").write_text("if __name__ == \"__main__\":\n"
+		"\traise ValueError\n"
+		"from magcot import *\n"
+		"GuiAnnotation(\"demo:gui/main\")\n")
+	reports = build_all([str(scripts / fn) for fn in
+		("one.py", "bad.py", "main.py")], str(assets / "out"), ("json",),
+		workers=2, incremental=True)
+	assert [rep.status for rep in reports] == ["ok", "failed", "ok"]
+	assert "SystemExit: 3" in reports[1].error
+	assert (assets / "out" / "one.json").is_file()
+	assert (assets / "out" / ".magcot-manifest.json").is_file()
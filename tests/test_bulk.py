@@ -0,0 +1,25 @@
+'''Bulk construction of elements.
+'''
+
+from magcot import *
+
+
+
+def test_grid_matches_single_slots(assets, monkeypatch):
+	a = GuiAnnotation("demo:gui/main")
+	calls = []
+	monkeypatch.setattr(Element, "invalidate",
+		lambda self: calls.append(self.id))
+	slots = ItemSlot.grid("s_{row}_{col}", (8, 84), 3, 9)
+	assert calls == []
+	# trusted, nothing is dispatched or invalidated
+	monkeypatch.undo()
+	single = ItemSlot.of("s_1_2", (44, 102))
+	assert slots[11].to_object() == single.to_object()
+	assert list(slots[11].patches) == list(single.patches) == ["area"]
+	assert (slots[11].area.ul, slots[11].area.size) == \
+		(single.area.ul, single.area.size)
+	assert slots[11].area._owner is slots[11]
+	a.annotate_many(slots)
+	slots[11].area.ul = (0, 0)
+	assert a.query_point(1, 1) == [slots[11]]
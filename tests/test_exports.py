@@ -0,0 +1,37 @@
+'''Memoized exports of elements and annotations.
+'''
+
+from magcot import *
+
+
+
+def test_exports_are_copies(assets):
+	a = GuiAnnotation("demo:gui/main")
+	a - ItemSlot.of("s0", (8, 84))
+	a - Rectangle.of("rect", (3, 4), (5, 6))
+	before = a.serialize()
+	a.serialize()["elements"][0]["ul"][0] = -1
+	a.element_objects()[0]["name"] = "x"
+	a.elements["s0"].to_object()["ul"].append(0)
+	assert a.serialize() == before
+	assert a.elements["s0"].to_object() == before["elements"][0]
+
+
+
+def test_creating_elements_keeps_exports(assets, tmp_path):
+	a = GuiAnnotation("demo:gui/main")
+	a - ItemSlot.of("s0", (8, 84))
+	a - FluidTank.of("tank", (10, 10), (16, 50), "+y")
+	a.serialize()
+	revision = a._revision
+	Corner.of("unrelated", (0, 0))
+	assert a._revision == revision
+	a.elements["s0"].ul.at = (1, 1)
+	assert a._revision == revision + 1
+	# # #
+	a.serialize(str(tmp_path / "gui.json"))
+	b = GuiAnnotation.load(str(tmp_path / "gui.json"))
+	b.serialize()
+	revision = b._revision
+	b.elements["tank"], b.elements["s0"]
+	assert b._revision == revision
@@ -0,0 +1,15 @@
+'''Ordinal symbols of elements.
+'''
+
+from magcot.providers import OrdinalTables, ordinal
+
+
+
+def test_ordinal_unique_past_series():
+	table = OrdinalTables().get("latin")
+	n = len(table) * (len(table) + 2)
+	# past the one- and the two-character symbols
+	symbols = [ordinal("latin", i) for i in range(n)]
+	assert symbols[:len(table)] == list(table)
+	assert len(set(symbols)) == n
+	assert ordinal("latin", len(table)) == table[0] * 2
@@ -0,0 +1,52 @@
+'''Optimization of PNG files embedded into pages.
+'''
+
+import zlib
+
+import pytest
+
+from magcot.pngchunks import iter_chunks, optimize_PNG, pack_chunk
+from magcot.texcache import PNG_SIGNATURE
+
+
+
+def make_png(*extra):
+	rows = b"".join(b"\0" + b"\x10\x20\x30\xff" * 4 for _ in range(4))
+	data = zlib.compress(rows)
+	return (PNG_SIGNATURE
+		+ pack_chunk(b"IHDR", b"\0\0\0\4\0\0\0\4\x08\x06\0\0\0")
+		+ b"".join(pack_chunk(kind, body) for kind, body in extra)
+		+ pack_chunk(b"IDAT", data[:5]) + pack_chunk(b"IDAT", data[5:])
+		+ pack_chunk(b"IEND", b""))
+
+
+
+def test_metadata_is_stripped():
+	content = make_png((b"tEXt", b"Software\0editor"),
+		(b"tIME", b"\x07\xea\x0a\x11\0\0\0"), (b"gAMA", b"\0\0\xb1\x8f"))
+	optimized = optimize_PNG(content)
+	kinds = [kind for kind, _ in iter_chunks(optimized)]
+	assert kinds == [b"IHDR", b"gAMA", b"IDAT", b"IEND"]
+	image_data = b"".join(data for kind, data in iter_chunks(content)
+		if kind == b"IDAT")
+	assert dict(iter_chunks(optimized))[b"IDAT"] == image_data
+	# merged, not deflated again
+	assert len(optimized) < len(content)
+
+
+
+def test_deflated_again_losslessly():
+	content = make_png()
+	optimized = optimize_PNG(content, level=9)
+	stream = lambda png: zlib.decompress(b"".join(data
+		for kind, data in iter_chunks(png) if kind == b"IDAT"))
+	assert stream(optimized) == stream(content)
+
+
+
+def test_bad_files_are_rejected():
+	content = make_png()
+	with pytest.raises(ValueError):
+		optimize_PNG(content[:-6])
+	with pytest.raises(ValueError):
+		optimize_PNG(b"GIF89a" + content[6:])
@@ -0,0 +1,38 @@
+'''Streaming serialization, against `GuiAnnotation.serialize`.
+'''
+
+import json
+
+from magcot import *
+
+
+
+def annotations():
+	yield GuiAnnotation("demo:gui/main")
+	a = GuiAnnotation("demo:gui/main")
+	a @ ("demo:gui/bars", "b")
+	a + "inv"
+	for c in range(3):
+		a - ItemSlot.of(f"s{c}", (8 + 18 * c, 84))
+	a + "machine"
+	a - FluidTank.of("tank", (10, 10), (16, 50), "-y")
+	a - ProgressBar.of("arrow", (80, 35), (22, 15), "+x", "b")
+	a - Atlas.of("icons", (0, 0), (4, 2), (16, 16), "b")
+	a + None
+	a - Corner.of("corner", (1, 2))
+	a - Crop.of("crop", (20, 20), (10, 10))
+	yield a
+
+
+
+def test_stream_serialize_matches(assets):
+	for i, a in enumerate(annotations()):
+		plain, streamed = (str(assets / f"{kind}{i}.json")
+			for kind in ("plain", "streamed"))
+		a.serialize(plain)
+		a.stream_serialize(streamed, compact=False)
+		with open(plain, "rb") as p, open(streamed, "rb") as s:
+			assert s.read() == p.read()
+		a.stream_serialize(streamed)
+		with open(streamed, encoding="utf-8") as s:
+			assert json.load(s) == a.serialize()
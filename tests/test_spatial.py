@@ -0,0 +1,82 @@
+'''Spatial data structures, checked against brute force, and the spatial
+	index of `GuiAnnotation`.
+'''
+
+import pytest
+
+import random
+
+from magcot import *
+from magcot.spatial import GridIndex, contains, find_intersections, \
+	intersects
+
+
+
+def random_regions(rng, n):
+	built = []
+	for _ in range(n):
+		x, y = rng.randrange(-20, 100), rng.randrange(-20, 100)
+		w, h = rng.randrange(0, 30), rng.randrange(0, 30)
+		built.append((x, y, x + w, y + h))
+		# some are empty
+	return built
+
+
+
+def test_find_intersections_brute_force():
+	rng = random.Random(5)
+	for n in (0, 1, 2, 30, 200):
+		regions = random_regions(rng, n)
+		valid = [r[0] < r[2] and r[1] < r[3] for r in regions]
+		expected = {(i, j) for i in range(n) for j in range(i + 1, n)
+			if valid[i] and valid[j] and intersects(regions[i], regions[j])}
+		found = find_intersections(regions)
+		assert len(found) == len(set(found))
+		assert set(found) == expected
+
+
+
+def test_grid_index_queries_brute_force():
+	rng = random.Random(4)
+	regions = random_regions(rng, 150)
+	index = GridIndex(cell_size=8)
+	for i, region in enumerate(regions):
+		index.insert(region, i)
+	valid = [i for i, r in enumerate(regions) if r[0] < r[2] and r[1] < r[3]]
+	for _ in range(200):
+		x, y = rng.randrange(-25, 130), rng.randrange(-25, 130)
+		assert index.query_point(x, y) == [i for i in valid
+			if intersects((x, y, x + 1, y + 1), regions[i])]
+		rect = random_regions(rng, 1)[0]
+		for contained, test in ((False, intersects), (True, contains)):
+			expected = ([i for i in valid if test(rect, regions[i])]
+				if rect[0] < rect[2] and rect[1] < rect[3] else [])
+			assert index.query_rect(rect, contained) == expected
+
+
+
+def test_grid_index_update():
+	index = GridIndex(cell_size=8)
+	a = index.insert((0, 0, 10, 10), "a")
+	b = index.insert((20, 20, 30, 30), "b")
+	index.update(a, (25, 25, 40, 40))
+	assert index.query_point(1, 1) == []
+	assert index.query_point(26, 26) == ["a", "b"]
+	index.remove(b)
+	assert index.query_point(26, 26) == ["a"]
+	assert len(index) == 1
+
+
+
+@pytest.mark.parametrize("storage", ["object", "columnar"])
+def test_edits_are_indexed(assets, storage):
+	if storage == "columnar":
+		pytest.importorskip("numpy")
+	a = GuiAnnotation("demo:gui/main", storage=storage)
+	a - Rectangle.of("p", (0, 0), (10, 10))
+	a - Rectangle.of("q", (50, 50), (10, 10))
+	assert a.find_overlaps() == []
+	a["p"].area.ul = (48, 48)
+	assert [el.id for el in a.query_point(55, 55)] == ["p", "q"]
+	assert a.query_point(1, 1) == []
+	assert a.find_overlaps() == [("", ("p", "area"), ("q", "area"))]
@@ -0,0 +1,65 @@
+'''Parity between the object storage and the columnar storage of
+	`GuiAnnotation`.
+'''
+
+import pytest
+
+from magcot import *
+
+np = pytest.importorskip("numpy")
+
+
+
+def annotate(storage):
+	a = GuiAnnotation("demo:gui/main", storage=storage)
+	a @ ("demo:gui/bars", "b")
+	a + "inv"
+	for c in range(9):
+		a - ItemSlot.of(f"s{c}", (8 + 18 * c, 84))
+	a + "machine"
+	a - FluidTank.of("tank", (10, 10), (16, 50), "+y")
+	a - ProgressBar.of("arrow", (80, 35), (22, 15), "+x", "b")
+	a - Atlas.of("icons", (0, 0), (4, 2), (16, 16), "b")
+	a + None
+	a - Corner.of("corner", (1, 2))
+	a - Rectangle.of("rect", (3, 4), (5, 6))
+	a - Crop.of("crop", (20, 20), (10, 10))
+	return a
+
+
+
+def test_exports_match(assets):
+	plain, columnar = annotate("object"), annotate("columnar")
+	assert columnar.serialize() == plain.serialize()
+	assert columnar.to_Java_fragment() == plain.to_Java_fragment()
+
+
+
+def test_marker_edits_match(assets):
+	plain, columnar = annotate("object"), annotate("columnar")
+	for a in (plain, columnar):
+		a.serialize()
+		a.to_Java_fragment()
+		# memoized before the edits
+		a.elements["s1"].ul.at = (1, 1)
+		a.elements["tank"].area.size = (8, 40)
+		a.elements["icons"].grid.clip = (8, 8)
+	assert columnar.elements["s1"].to_object() == \
+		plain.elements["s1"].to_object()
+	assert columnar.elements["s1"].to_object()["ul"] == [1, 1]
+	assert columnar.serialize() == plain.serialize()
+	assert columnar.to_Java_fragment() == plain.to_Java_fragment()
+
+
+
+def test_many_groups_match(assets):
+	plain, columnar = (GuiAnnotation("demo:gui/main", storage=storage)
+		for storage in ("object", "columnar"))
+	for a in (plain, columnar):
+		for c in range(70):
+			a + f"g{c}"
+			a - ItemSlot.of(f"s{c}", (c, c))
+		a + None
+		a - Corner.of("free", (1, 2))
+	assert columnar.serialize() == plain.serialize()
+	assert list(columnar.ungrouped_elements) == ["free"]
@@ -0,0 +1,17 @@
+'''The persistent cache of texture metadata.
+'''
+
+from concurrent.futures import ThreadPoolExecutor
+
+from magcot.texcache import TextureMetadataCache
+
+
+
+def test_one_instance_across_threads(monkeypatch):
+	monkeypatch.setenv("MAGCOT_TEXTURE_CACHE", "")
+	monkeypatch.setattr(TextureMetadataCache,
+		"_TextureMetadataCache__instance", None)
+	with ThreadPoolExecutor(max_workers=8) as executor:
+		found = list(executor.map(lambda _: TextureMetadataCache(),
+			range(64)))
+	assert all(cache is found[0] for cache in found)